@@ -1,62 +1,54 @@
 from dotenv import load_dotenv
-from typing import Annotated, List, Dict, Any, Optional
+from typing import Annotated, List, Dict, Any, Optional, Tuple
 from mcp.server.fastmcp import FastMCP
 from langchain_core.tools import tool
 from langchain_mcp_adapters.tools import to_fastmcp
-import pandas as pd
 import os
 import json
 import datetime
+from tools.email_store import EmailStore
+from tools.table_cache import TableCache
 
 # load environment variables from .env file
 load_dotenv()
 workfolder = os.getenv('WORKFOLDER')
-projects_df = pd.read_csv(os.path.join(workfolder, "projects.csv"))
-email_reasons_df = pd.read_csv(os.path.join(workfolder, "email_reasons.csv"))
+table_cache = TableCache()
+email_store = EmailStore(os.path.join(workfolder, "emails.db"), csv_path=os.path.join(workfolder, "emails.csv"))
 
 
 @tool
 def send_email(from_email: Annotated[str, "The sender's email address."], 
     to_email:Annotated[str, "The recipient's email address."], 
     subject:Annotated[str, "The subject of the email."], 
-    body:Annotated[str, "The body of the email."]
+    body:Annotated[str, "The body of the email."],
+    priority:Annotated[Optional[int], "Processing priority, higher is processed first (default: 0)."] = 0
     ) -> Annotated[str, "result message"]:
     """ Sends an email."""
     try:
         now = datetime.datetime.now()
         date_string = now.strftime("%d/%m/%Y %H:%M:%S")
         email = {'date': date_string, 'from_email': from_email, 'to_email': to_email, 'tags': '', 'subject': subject, 'body': body}
-        file_path = os.path.join(workfolder, "emails.csv")
-        if os.path.exists(file_path):
-            emails_df = pd.read_csv(file_path, index_col='id')
-            emails_df = pd.concat([emails_df, pd.DataFrame([email])], ignore_index=True)
-        else:
-            emails_df = pd.DataFrame([email])
-
-        emails_df.to_csv(file_path, index=True, index_label='id')
+        email_store.append(email, priority=priority or 0)
         return "email sent successfully"
     except Exception as e:
        return f"email sending failed {e}"
 
 @tool
 def get_emails() -> dict:
-    """ Returns the last email received by the system, in json: {'id': 0, 'date': '', 'from_email': '', 'to_email': '', 'tags': '', 'subject': '', 'body': ''}.
+    """ Returns the next email pending to be tagged, in json: {'id': 0, 'date': '', 'from_email': '', 'to_email': '', 'tags': '', 'subject': '', 'body': ''}.
     """
-    emails_df = pd.read_csv(os.path.join(workfolder, "emails.csv"), index_col='id')
-
-    # Filter for emails with empty or NaN tags
-    emails_without_tags = emails_df[emails_df['tags'].isnull() | (~emails_df['tags'].fillna('').str.contains(','))]
+    # oldest email with less than two tags
+    email = email_store.next_pending()
 
-    if not emails_without_tags.empty:
-        return emails_without_tags.fillna('').reset_index().sample(1).iloc[0].to_dict()
+    if email is not None:
+        return email
     else:
         return "No new messages"
 
 @tool 
 def get_projects() -> Annotated[List[Dict[str, Any]], "the project list"]:
     """Returns the list of projects"""
-    projects_df = pd.read_csv(os.path.join(workfolder, "projects.csv"))
-    return projects_df.to_dict( orient="records")
+    return table_cache.records(os.path.join(workfolder, "projects.csv"))
 
 @tool
 def modify_email(email_id: Annotated[int, "The ID of the email to tag."], 
@@ -64,29 +56,34 @@ def modify_email(email_id: Annotated[int, "The ID of the email to tag."],
     ) -> Annotated[str, "result message"]:
     """ Modifies an email identified by its ID, adding a tag to it."""
     try:
-        emails_df = pd.read_csv(os.path.join(workfolder, "emails.csv"), index_col='id')
-        tags = emails_df.at[email_id, 'tags'] if pd.notna(emails_df.at[email_id, 'tags']) else ''
-        tags = tags.split(',') if len(tags) > 1 else []
-        tags.append(tag_string)
-        tags = list(set(tags))
-        tags = ','.join(tags)
-        emails_df.at[email_id, 'tags'] = str(tags)
-        emails_df.to_csv(os.path.join(workfolder, "emails.csv"), index=True, index_label='id')
+        email_store.add_tag(email_id, tag_string)
         return f"email {email_id} updated successfully with tag {tag_string}"
     except Exception as e:
         return f"email modifying failed {e}"
 
+@tool
+def modify_emails_bulk(email_tags: Annotated[List[Tuple[int, str]], "List of [email_id, tag] pairs to apply."]
+    ) -> Annotated[List[str], "result message for each pair"]:
+    """ Adds tags to many emails at once, in a single transaction."""
+    try:
+        results = email_store.add_tags(email_tags)
+    except Exception as e:
+        return [f"email modifying failed {e}"] * len(email_tags)
+    return [f"email modifying failed {result}" if isinstance(result, Exception) 
+        else f"email {email_id} updated successfully with tag {tag_string}"
+        for (email_id, tag_string), result in zip(email_tags, results)]
+
 @tool
 def get_reasons() -> Annotated[List[Dict[str, Any]], "the reasons list"]:
     """Returns the list of reasons for sending an email"""
-    email_reasons_df = pd.read_csv(os.path.join(workfolder, "email_reasons.csv"))
-    return email_reasons_df.to_dict(orient="records")
+    return table_cache.records(os.path.join(workfolder, "email_reasons.csv"))
 
 tools=[
     to_fastmcp(get_emails), 
     to_fastmcp(get_projects), 
     to_fastmcp(get_reasons), 
     to_fastmcp(modify_email), 
+    to_fastmcp(modify_emails_bulk), 
     to_fastmcp(send_email), 
     ]
 
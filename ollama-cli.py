@@ -5,49 +5,33 @@ Uso: python ollama-cli.py "tu prompt aquí"
 """
 
 import argparse
-import subprocess
+import asyncio
 import sys
-import time
 
 from langchain_ollama import ChatOllama
-from langchain_mcp_adapters.client import MCPClient
+from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_core.messages import HumanMessage
+from tools import mcp_daemon
 
 
 def create_mcp_client():
-    """Inicia el servidor MCP como subproceso y devuelve un cliente MCP."""
-    # Ruta al script MCP
-    mcp_script = "/home/daimler/workspaces/curso-ia-para-empresas/tools/mcp-srv.py"
-    
-    # Inicia el servidor MCP en stdin/stdout
-    process = subprocess.Popen(
-        [sys.executable, mcp_script],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1
-    )
-
-    # Esperar 2 segundos para que el servidor MCP inicie
-    time.sleep(2)
-    if process.poll() is not None:
-        raise RuntimeError(f"MCP server failed to start. Error:\n{process.stderr.read()}")
+    """Conecta con el servidor MCP persistente (lo arranca si no está en marcha) y devuelve un cliente MCP."""
+    # Reutiliza el servidor MCP por su socket unix privado; solo la primera invocación paga el arranque
+    connection = mcp_daemon.ensure_server(mcp_daemon.MCP_SERVER_SCRIPT)
 
-    # Crea y conecta el cliente MCP
-    client = MCPClient(process.stdout, process.stdin)
-    return client, process
+    # Crea el cliente MCP
+    client = MultiServerMCPClient({"mcp": connection})
+    return client
 
 
 def stream_response(client, prompt: str):
     """Llama al modelo con herramientas MCP y muestra la respuesta en streaming."""
     try:
-        # Crea el LLM conectado al cliente MCP
+        # Crea el LLM con las herramientas del servidor MCP
         llm = ChatOllama(
             model="qwen3.5:0.8b",  # ajusta el modelo según tu entorno
-            mcp_client=client,
             temperature=0.7,
-        )
+        ).bind_tools(asyncio.run(client.get_tools()))
 
         # Invoca el modelo en modo streaming
         for chunk in llm.stream([HumanMessage(content=prompt)]):
@@ -73,25 +57,17 @@ def main():
         print("  python ask_ollama_cli.py \"¿cuál es la fecha actual?\"", file=sys.stderr)
         sys.exit(1)
 
-    # Inicia cliente MCP
+    # Conecta con el servidor MCP
     try:
-        client, process = create_mcp_client()
+        client = create_mcp_client()
     except Exception as e:
         print(f"❌ Error al iniciar MCP: {e}", file=sys.stderr)
         sys.exit(1)
 
     # Genera y muestra respuesta en streaming
-    try:
-        print("🤖 Respuesta: ", end="", flush=True)
-        stream_response(client, prompt)
-        print()  # salto de línea final
-    finally:
-        # Cierra el subproceso MCP
-        try:
-            process.terminate()
-            process.wait(timeout=3)
-        except Exception:
-            process.kill()
+    print("🤖 Respuesta: ", end="", flush=True)
+    stream_response(client, prompt)
+    print()  # salto de línea final
 
 
 if __name__ == "__main__":
@@ -8,11 +8,27 @@ CLI tool to interact with Qwen3 LLM using LangChain's ChatOllama and a custom MC
 import argparse
 import sys
 import asyncio
+import json
 
 from langchain_ollama import ChatOllama
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage, message_chunk_to_message
 from langchain_core.prompts import ChatPromptTemplate
+from tools import mcp_daemon
+from tools.prompt_prefix import PrefixStats, stable_tools
+
+# kept identical between turns and runs (same working directory) so the model
+# server can reuse the cached prefix of the prompt
+SYSTEM_PROMPT = """. 
+You are a helpful AI assistant with access to MCP tools. Use them when appropriate.
+Answer only what is asked — no greetings, no explanations, no extra text. 
+Be brief and precise.
+- SO: Ubuntu 25
+- PWD: {cwd}
+- Language: Spanish 
+"""
+# appended when --max-steps is reached; the tools stay bound so the prompt keeps its cached prefix
+FINAL_PROMPT = "Tool budget exhausted. Answer now with the information gathered so far, without calling any tool."
 
 
 def parse_args():
@@ -27,8 +43,34 @@ def parse_args():
     )
     parser.add_argument(
         "--mcp-server", 
-        default="/home/daimler/workspaces/curso-ia-para-empresas/tools/mcp-srv.py", 
-        help="Path to MCP server script (default: /home/daimler/workspaces/curso-ia-para-empresas/tools/mcp-srv.py)"
+        default=mcp_daemon.MCP_SERVER_SCRIPT, 
+        help=f"Path to MCP server script (default: {mcp_daemon.MCP_SERVER_SCRIPT})"
+    )
+    parser.add_argument(
+        "--mcp-socket", 
+        default=mcp_daemon.MCP_SOCKET, 
+        help=f"Unix socket of the persistent MCP server, started on first use (default: {mcp_daemon.MCP_SOCKET})"
+    )
+    parser.add_argument(
+        "--no-daemon", 
+        action="store_true", 
+        help="Spawn a private stdio MCP server instead of reusing the persistent one"
+    )
+    parser.add_argument(
+        "--max-steps", 
+        type=int,
+        default=5, 
+        help="Maximum number of tool-calling turns before answering (default: 5)"
+    )
+    parser.add_argument(
+        "--no-stream", 
+        action="store_true", 
+        help="Print the answer when the generation finishes instead of streaming tokens"
+    )
+    parser.add_argument(
+        "--stats", 
+        action="store_true", 
+        help="Print prompt tokens processed and reused from the cache for every model call"
     )
     parser.add_argument(
         "--verbose", 
@@ -38,74 +80,145 @@ def parse_args():
     return parser.parse_args()
 
 
+async def execute_tool_call(tools_by_name, tool_call, verbose = False) -> ToolMessage:
+    """Runs a tool call requested by the LLM and wraps the result in a ToolMessage."""
+    tool_name = tool_call["name"]
+    tool_args = tool_call["args"]
+
+    tool_to_call = tools_by_name.get(tool_name)
+    if tool_to_call is None:
+        print(f"Unknown tool requested: {tool_name}", file=sys.stderr)
+        return ToolMessage(content=f"Unknown tool: {tool_name}", tool_call_id=tool_call["id"], name=tool_name, status="error")
+
+    try:
+        result = await tool_to_call.ainvoke(tool_args)
+    except Exception as e:
+        return ToolMessage(content=f"Error: {e}", tool_call_id=tool_call["id"], name=tool_name, status="error")
+
+    if verbose:
+        print(f"Executed tool '{tool_name}' with args {tool_args} → result: {result}", file=sys.stderr)
+    return ToolMessage(content=str(result), tool_call_id=tool_call["id"], name=tool_name)
+
+
+def invalid_tool_messages(message) -> list[ToolMessage]:
+    """Error ToolMessages for the tool calls of the message whose arguments could not be parsed."""
+    return [ToolMessage(content=f"Error: invalid arguments for tool {invalid_call.get('name')}: {invalid_call.get('args')}",
+        tool_call_id=invalid_call.get("id") or "", name=invalid_call.get("name") or "", status="error")
+        for invalid_call in message.invalid_tool_calls]
+
+
+def parse_complete_args(args):
+    """Returns the arguments of a streamed tool call once its JSON object is complete, otherwise None."""
+    if isinstance(args, dict):
+        return args
+    try:
+        args = json.loads(args or "")
+    except json.JSONDecodeError:
+        return None
+    return args if isinstance(args, dict) else None
+
+
+async def stream_turn(llm_with_tools, messages, tools_by_name, verbose = False, run_tools = True):
+    """
+    Streams one model turn: prints the text tokens as they arrive and starts
+    every tool call as soon as it has been streamed completely (unless run_tools
+    is False). Returns the AI message and the ToolMessages of its tool calls.
+    """
+    message = None
+    tasks = {}
+    async for chunk in llm_with_tools.astream(messages):
+        if chunk.content:
+            print(chunk.content, end="", flush=True)
+        message = chunk if message is None else message + chunk
+
+        for tool_call_chunk in message.tool_call_chunks:
+            # keyed by id: a call without one is only run once the message is complete
+            call_id = tool_call_chunk.get("id")
+            if not run_tools or call_id is None or call_id in tasks or not tool_call_chunk.get("name"):
+                continue
+            args = parse_complete_args(tool_call_chunk.get("args"))
+            if args is not None:
+                tool_call = {"name": tool_call_chunk["name"], "args": args, "id": call_id}
+                tasks[call_id] = asyncio.create_task(execute_tool_call(tools_by_name, tool_call, verbose))
+
+    message = message_chunk_to_message(message)
+    if not run_tools:
+        return message, []
+    results = []
+    for tool_call in message.tool_calls:
+        # tool calls whose arguments never parsed as a complete object while streaming
+        task = tasks.pop(tool_call["id"], None) if tool_call["id"] is not None else None
+        results.append(task or asyncio.create_task(execute_tool_call(tools_by_name, tool_call, verbose)))
+    results.extend(tasks.values())
+    return message, list(await asyncio.gather(*results)) + invalid_tool_messages(message)
+
+
 async def run_async(args):
     try:
-        # 1. Create MCP client connection (stdio transport)
-        mcp_client = MultiServerMCPClient({"mcp": {"command": "python","args": [args.mcp_server], "transport": "stdio", }})
+        # 1. Create MCP client connection (persistent server on a unix socket, or stdio transport)
+        if args.no_daemon:
+            connection = {"command": sys.executable, "args": [args.mcp_server], "transport": "stdio", }
+        else:
+            connection = mcp_daemon.ensure_server(args.mcp_server, socket_path=args.mcp_socket)
+        mcp_client = MultiServerMCPClient({"mcp": connection})
 
         # 2. Get available tools from MCP server (async)
         tools = await mcp_client.get_tools()
 
         if args.verbose:
-            print(f"Connected to MCP server at {args.mcp_server}", file=sys.stderr)
+            print(f"Connected to MCP server {args.mcp_server if args.no_daemon else args.mcp_socket}", file=sys.stderr)
             print(f"Available MCP tools: {[t.name for t in tools]}", file=sys.stderr)
 
         # 3. Initialize Ollama model
+        stats = PrefixStats(file=sys.stderr) if args.stats else None
         llm = ChatOllama(
             model=args.model,
             reasoning=False,
+            callbacks=[stats] if stats else None,
             # temperature=0.7,
             # num_predict=1024
         )
 
-        # 4. Bind tools to the LLM
-        llm_with_tools = llm.bind_tools(tools)
+        # 4. Bind tools to the LLM, sorted and serialized the same way on every run
+        llm_with_tools = llm.bind_tools(stable_tools(tools))
 
         # 5. Prepare chat history (system + user prompt)
-        system_prompt = f""". 
-You are a helpful AI assistant with access to MCP tools. Use them when appropriate.
-Answer only what is asked — no greetings, no explanations, no extra text. 
-Be brief and precise.
-- SO: Ubuntu 25
-- PWD: {os.getcwd()}
-- Language: Spanish 
-"""
+        system_prompt = SYSTEM_PROMPT.format(cwd=os.getcwd())
         messages = [
             SystemMessage(content=system_prompt),  # se incluye la info del sistema al inicio
             HumanMessage(content=args.prompt)
         ]
-        # 6. Invoke the chain (async)
-        response = await llm_with_tools.ainvoke(messages)
-
-        # 7. Handle response: print content or execute tools
-        if response.tool_calls:
-            print("LLM wants to use tools:", response.tool_calls, file=sys.stderr)
-            for tool_call in response.tool_calls:
-                tool_name = tool_call["name"]
-                tool_args = tool_call["args"]
-
-                tool_to_call = next((t for t in tools if t.name == tool_name), None)
-                if tool_to_call:
-                    try:
-                        # Try async invoke first
-                        result = await tool_to_call.ainvoke(tool_args)
-                    except AttributeError:
-                        # Fall back to sync invoke in a thread
-                        import asyncio
-                        result = await asyncio.to_thread(tool_to_call.invoke, tool_args)
-
-                    if args.verbose:
-                        print(f"Executed tool '{tool_name}' with args {tool_args} → result: {result}", file=sys.stderr)
-
-                    messages.append(AIMessage(content=f"Tool result: {result}"))
-                    messages.append(HumanMessage(content="Please summarize the tool execution result."))
-                    final_response = await llm_with_tools.ainvoke(messages)
-                    print(final_response.content)
-                else:
-                    print(f"Unknown tool requested: {tool_name}", file=sys.stderr)
-                    print(response.content)
+        # 6. Agent loop: run the tool calls of each turn concurrently and return
+        #    the results as ToolMessages in the next turn
+        tools_by_name = {t.name: t for t in tools}
+        for step in range(args.max_steps):
+            if args.no_stream:
+                response = await llm_with_tools.ainvoke(messages)
+                tool_messages = list(await asyncio.gather(*(
+                    execute_tool_call(tools_by_name, tool_call, args.verbose) for tool_call in response.tool_calls)))
+                tool_messages += invalid_tool_messages(response)
+            else:
+                response, tool_messages = await stream_turn(llm_with_tools, messages, tools_by_name, args.verbose)
+
+            messages.append(response)
+            if not response.tool_calls and not response.invalid_tool_calls:
+                break
+
+            if args.verbose:
+                print(f"Step {step + 1}, LLM used tools:", response.tool_calls, file=sys.stderr)
+            messages.extend(tool_messages)
         else:
-            print(response.content)
+            # 7. Max depth reached: answer with the results gathered so far, with
+            #    the same tools bound so the request extends the cached prompt
+            messages.append(HumanMessage(content=FINAL_PROMPT))
+            if args.no_stream:
+                response = await llm_with_tools.ainvoke(messages)
+            else:
+                response, _ = await stream_turn(llm_with_tools, messages, tools_by_name, args.verbose, run_tools=False)
+
+        print(response.content if args.no_stream else "")
+        if stats:
+            print(f"Total: {stats.summary()}", file=sys.stderr)
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -0,0 +1,79 @@
+import unittest
+import asyncio
+import tempfile
+import os
+from tools.cv_batch import CVBatchConverter
+from odf.opendocument import OpenDocumentText
+from odf.text import H, P
+from tools.odt_tools import OdtDocument
+
+
+def make_document(file_path, sections):
+    doc = OpenDocumentText()
+    for n in range(sections):
+        doc.text.addElement(H(outlinelevel=1, text=f"Section {n}"))
+        for i in range(5):
+            doc.text.addElement(P(text=f"Experience {n}.{i} with several technologies"))
+    doc.save(file_path)
+
+
+running = {'now': 0, 'max': 0}
+
+
+async def adapt(indexed_text, job_offer):
+    running['now'] += 1
+    running['max'] = max(running['max'], running['now'])
+    await asyncio.sleep(0.2)
+    running['now'] -= 1
+    if "broken" in job_offer and len(indexed_text) > 15:
+        raise ValueError("model error")
+    if "empty" in job_offer and len(indexed_text) > 15:
+        return None
+    return {index: f"{text} for **{job_offer}**" for index, text in indexed_text.items() if text.startswith('#')}
+
+
+class CVBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.input_folder = tempfile.mkdtemp()
+        self.output_folder = os.path.join(tempfile.mkdtemp(), "adapted")
+        for i in range(4):
+            make_document(os.path.join(self.input_folder, f"cv{i}.odt"), sections=i + 1)
+        with open(os.path.join(self.input_folder, "corrupt.odt"), 'w') as f:
+            f.write("not a zip file")
+        self.progress = []
+
+    def test_convert_folder(self):
+        running['max'] = 0
+        converter = CVBatchConverter(adapt, llm_concurrency=4, max_workers=2, on_progress=self.progress.append)
+        reports = converter.convert(self.input_folder, "Python developer", self.output_folder)
+        self.assertGreater(running['max'], 1)
+        self.assertEqual([report['file'] for report in reports], ["corrupt.odt", "cv0.odt", "cv1.odt", "cv2.odt", "cv3.odt"])
+        self.assertEqual((reports[0]['status'], reports[0]['stage']), ('failed', 'read'))
+        self.assertEqual([report['replaced'] for report in reports[1:]], [1, 2, 3, 4])
+        self.assertEqual(len(self.progress), 5)
+        text = OdtDocument(os.path.join(self.output_folder, "cv1.odt")).get_indexed_text()
+        self.assertIn("Section 1 for Python developer", text.values())
+
+    def test_adapt_failures_are_reported_per_document(self):
+        converter = CVBatchConverter(adapt, max_workers=2, on_progress=self.progress.append)
+        reports = converter.convert(self.input_folder, "broken", self.output_folder)
+        failed = {report['file']: report['stage'] for report in reports if report['status'] == 'failed'}
+        self.assertEqual(failed, {"corrupt.odt": 'read', "cv2.odt": 'adapt', "cv3.odt": 'adapt'})
+        self.assertTrue(os.path.exists(os.path.join(self.output_folder, "cv0.odt")))
+
+    def test_bad_answers_and_callbacks_only_fail_their_document(self):
+        def on_progress(report):
+            self.progress.append(report)
+            raise RuntimeError("callback error")
+
+        converter = CVBatchConverter(adapt, llm_concurrency=1, max_workers=2, on_progress=on_progress)
+        reports = converter.convert(self.input_folder, "empty", self.output_folder)
+        failed = {report['file']: report['stage'] for report in reports if report['status'] == 'failed'}
+        self.assertEqual(failed, {"corrupt.odt": 'read', "cv2.odt": 'adapt', "cv3.odt": 'adapt'})
+        self.assertIn("NoneType", reports[3]['error'])
+        self.assertEqual(len(self.progress), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
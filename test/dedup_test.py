@@ -0,0 +1,41 @@
+import unittest
+from langchain_core.documents import Document
+from tools.dedup import DocumentDeduplicator, content_hash, deduplicate_documents
+
+ARTICLE = " ".join(f"sentence number {i} talks about local language models and research agents." for i in range(60))
+
+
+class DedupTest(unittest.TestCase):
+
+    def test_content_hash_ignores_case_punctuation_and_spacing(self):
+        self.assertEqual(content_hash("Hello,  World!\nAgain"), content_hash("hello world again"))
+        self.assertNotEqual(content_hash("hello world"), content_hash("hello there"))
+
+    def test_exact_and_near_duplicates_are_merged(self):
+        near = ARTICLE.replace("sentence number 30 ", "sentence number thirty ") + " Share this article."
+        docs = [Document(page_content=ARTICLE, metadata={'source': 'https://a.com/post'}),
+            Document(page_content=ARTICLE.upper(), metadata={'source': 'https://mirror.com/post'}),
+            Document(page_content=near, metadata={'source': 'https://b.com/post?page=1'}),
+            Document(page_content="a different page about cooking pasta with tomatoes and basil", metadata={'source': 'https://c.com'})]
+        unique = deduplicate_documents(docs)
+        self.assertEqual([doc.metadata['source'] for doc in unique], ['https://a.com/post', 'https://c.com'])
+        self.assertEqual(unique[0].metadata['duplicates'], ['https://mirror.com/post', 'https://b.com/post?page=1'])
+
+    def test_documents_seen_in_earlier_calls_are_dropped(self):
+        deduplicator = DocumentDeduplicator()
+        first = deduplicator.deduplicate([Document(page_content=ARTICLE, metadata={'source': 'a'})])
+        self.assertEqual(len(first), 1)
+        self.assertEqual(deduplicator.deduplicate([Document(page_content=ARTICLE, metadata={'source': 'b'})]), [])
+        stubs = deduplicator.deduplicate([Document(page_content=ARTICLE, metadata={'source': 'd'})], stubs=True)
+        self.assertEqual(stubs[0].metadata, {'source': 'd', 'duplicate_of': 'a'})
+        # the document returned by the first call is not modified
+        self.assertEqual(first[0].metadata, {'source': 'a'})
+
+    def test_empty_documents_are_kept(self):
+        docs = [Document(page_content='', metadata={'source': 'a', 'error': '404'}),
+            Document(page_content='', metadata={'source': 'b', 'error': '500'})]
+        self.assertEqual(len(deduplicate_documents(docs)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import tempfile
+import os
+import multiprocessing
+import threading
+import pandas as pd
+from tools.email_store import EmailStore
+
+
+def tag_in_process(db_path, email_id, prefix):
+    store = EmailStore(db_path)
+    for i in range(20):
+        store.add_tag(email_id, f"{prefix}{i}")
+    store.close()
+
+
+class TestEmailStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "emails.db")
+        self.csv_path = os.path.join(self.tmp.name, "emails.csv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def email(self, subject):
+        return {'date': '01/01/2025 10:00:00', 'from_email': 'a@example.com', 'to_email': 'b@example.com',
+            'tags': '', 'subject': subject, 'body': 'body'}
+
+    def test_append_allocates_consecutive_ids(self):
+        store = EmailStore(self.db_path)
+        self.assertEqual(store.append(self.email("first")), 1)
+        self.assertEqual(store.append(self.email("second")), 2)
+        self.assertEqual(store.get(2)['subject'], "second")
+        self.assertEqual(store.count(), 2)
+
+    def test_csv_is_imported_once_keeping_ids(self):
+        with open(self.csv_path, 'w') as f:
+            f.write("id,date,from_email,to_email,tags,subject,body\n")
+            f.write("0,01/01/2025 10:00:00,a@example.com,b@example.com,,hello,body\n")
+            f.write("1,01/01/2025 10:00:00,a@example.com,b@example.com,\"P1,UPDATE\",bye,body\n")
+        store = EmailStore(self.db_path, csv_path=self.csv_path)
+        self.assertEqual(store.get(1)['tags'], "P1,UPDATE")
+        self.assertEqual(store.append(self.email("new")), 2)
+        store.close()
+
+        store = EmailStore(self.db_path, csv_path=self.csv_path)
+        self.assertEqual(store.count(), 3)
+
+    def test_add_tag(self):
+        store = EmailStore(self.db_path)
+        email_id = store.append(self.email("hello"))
+        self.assertEqual(store.add_tag(email_id, "P1"), "P1")
+        self.assertEqual(store.add_tag(email_id, "P1"), "P1")
+        self.assertEqual(store.add_tag(email_id, "UPDATE"), "P1,UPDATE")
+        with self.assertRaises(KeyError):
+            store.add_tag(99, "P1")
+
+    def test_add_tags_reports_each_pair(self):
+        store = EmailStore(self.db_path)
+        first = store.append(self.email("first"))
+        second = store.append(self.email("second"))
+        results = store.add_tags([(first, "P1"), (99, "P1"), (first, "UPDATE"), (second, "P2")])
+        self.assertEqual(results[0], "P1")
+        self.assertIsInstance(results[1], KeyError)
+        self.assertEqual(results[2:], ["P1,UPDATE", "P2"])
+        self.assertEqual(store.next_pending()['id'], second)
+
+    def test_pending_queue_is_fifo(self):
+        store = EmailStore(self.db_path)
+        first = store.append(self.email("first"))
+        second = store.append(self.email("second"))
+        self.assertEqual(store.next_pending()['id'], first)
+        store.add_tag(first, "P1")
+        self.assertEqual(store.next_pending()['id'], first)
+        store.add_tag(first, "UPDATE")
+        self.assertEqual(store.next_pending()['id'], second)
+        self.assertEqual(store.pending_count(), 1)
+
+    def test_pending_queue_priority(self):
+        store = EmailStore(self.db_path)
+        store.append(self.email("normal"))
+        urgent = store.append(self.email("urgent"), priority=1)
+        self.assertEqual(store.next_pending()['id'], urgent)
+
+    def test_pending_queue_after_import(self):
+        with open(self.csv_path, 'w') as f:
+            f.write("id,date,from_email,to_email,tags,subject,body\n")
+            f.write("0,01/01/2025 10:00:00,a@example.com,b@example.com,\"P1,UPDATE\",done,body\n")
+            f.write("1,01/01/2025 10:00:00,a@example.com,b@example.com,P1,half,body\n")
+        store = EmailStore(self.db_path, csv_path=self.csv_path)
+        self.assertEqual(store.next_pending()['subject'], "half")
+        store.add_tag(1, "UPDATE")
+        self.assertIsNone(store.next_pending())
+
+    def test_concurrent_threads_do_not_lose_updates(self):
+        store = EmailStore(self.db_path)
+        email_id = store.append(self.email("shared"))
+
+        def work(prefix):
+            for i in range(20):
+                store.append(self.email(f"{prefix}{i}"))
+                store.add_tag(email_id, f"{prefix}{i}")
+
+        threads = [threading.Thread(target=work, args=(f"t{n}-",)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(store.count(), 1 + 8 * 20)
+        self.assertEqual(len(store.get(email_id)['tags'].split(',')), 8 * 20)
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        store = EmailStore(self.db_path)
+        email_id = store.append(self.email("shared"))
+        processes = [multiprocessing.Process(target=tag_in_process, args=(self.db_path, email_id, f"p{n}-"))
+            for n in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(len(store.get(email_id)['tags'].split(',')), 4 * 20)
+
+    def test_failed_write_does_not_undo_grouped_writes(self):
+        store = EmailStore(self.db_path)
+        with self.assertRaises(KeyError):
+            store.add_tag(99, "P1")
+        self.assertEqual(store.append(self.email("after error")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from tools.web_cache import WebCache
+from tools.llm_cache import LLMCache, llm_cache_key
+
+
+class FakeChatModel:
+
+    def __init__(self, model = "qwen3", temperature = 0, seed = 42):
+        self.model = model
+        self.temperature = temperature
+        self.seed = seed
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, messages, config = None, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.1)
+        return AIMessage(content=f"{self.model}: {messages[-1].content}")
+
+
+class LLMCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = LLMCache(WebCache(db_path=os.path.join(tempfile.mkdtemp(), "llm.db"), namespace='llm'))
+        self.messages = [SystemMessage(content="Summarize the text"), HumanMessage(content="some long page")]
+
+    def test_hit_skips_generation(self):
+        llm = FakeChatModel()
+        first = self.cache.invoke(llm, self.messages)
+        second = self.cache.invoke(llm, self.messages)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(llm.calls, 1)
+
+    def test_key_depends_on_model_options_prompt_and_input(self):
+        keys = {llm_cache_key("qwen3", {'seed': 42}, "system", "text"),
+            llm_cache_key("qwen3:14b", {'seed': 42}, "system", "text"),
+            llm_cache_key("qwen3", {'seed': 1}, "system", "text"),
+            llm_cache_key("qwen3", {'seed': 42}, "other system", "text"),
+            llm_cache_key("qwen3", {'seed': 42}, "system", "other text")}
+        self.assertEqual(len(keys), 5)
+        llm = FakeChatModel()
+        self.cache.invoke(llm, self.messages)
+        llm.temperature = 0.7
+        self.cache.invoke(llm, self.messages)
+        self.assertEqual(llm.calls, 2)
+
+    def test_concurrent_identical_calls_generate_once(self):
+        llm = FakeChatModel()
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: self.cache.invoke(llm, self.messages).content, range(8)))
+        self.assertEqual(set(results), {"qwen3: some long page"})
+        self.assertEqual(llm.calls, 1)
+
+    def test_memoize_caches_any_result(self):
+        calls = []
+        extract = lambda text: calls.append(text) or {'keywords': text.split()}
+        for _ in range(2):
+            result = self.cache.memoize("qwen3", {'seed': 42}, "Extract keywords", "python sql", extract, "python sql")
+        self.assertEqual(result, {'keywords': ['python', 'sql']})
+        self.assertEqual(calls, ["python sql"])
+
+
+if __name__ == '__main__':
+    unittest.main()
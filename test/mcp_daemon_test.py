@@ -0,0 +1,65 @@
+import unittest
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+from tools import mcp_daemon
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools")
+
+
+class TestMcpDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.folder, "run", "mcp.sock")
+
+    def tearDown(self):
+        mcp_daemon.stop_server(self.socket_path)
+        shutil.rmtree(self.folder)
+
+    def test_runtime_dir_must_be_private(self):
+        os.makedirs(os.path.dirname(self.socket_path), mode=0o755)
+        os.chmod(os.path.dirname(self.socket_path), 0o755)
+        with self.assertRaises(PermissionError):
+            mcp_daemon.runtime_dir(self.socket_path)
+
+    def test_fingerprint_changes_with_tool_code(self):
+        tools = shutil.copytree(TOOLS_DIR, os.path.join(self.folder, "tools"), ignore=shutil.ignore_patterns('__pycache__'))
+        script = os.path.join(tools, "mcp-srv.py")
+        fingerprint = mcp_daemon.source_fingerprint(script)
+        self.assertEqual(fingerprint, mcp_daemon.source_fingerprint(script))
+        self.assertNotEqual(fingerprint, mcp_daemon.source_fingerprint(mcp_daemon.MCP_SERVER_SCRIPT))
+        os.utime(os.path.join(tools, "bash_operations.py"), ns=(0, 0))
+        self.assertNotEqual(fingerprint, mcp_daemon.source_fingerprint(script))
+
+    def test_stop_ignores_a_reused_pid(self):
+        mcp_daemon.runtime_dir(self.socket_path)
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            with open(self.socket_path + ".pid", 'w') as f:
+                f.write(str(process.pid))
+            self.assertFalse(mcp_daemon.stop_server(self.socket_path))
+            self.assertIsNone(process.poll())
+            self.assertFalse(os.path.exists(self.socket_path + ".pid"))
+        finally:
+            process.kill()
+            process.wait()
+
+    def test_server_on_private_socket(self):
+        self.assertIsNone(mcp_daemon.server_info(self.socket_path))
+        mcp_daemon.ensure_server(socket_path=self.socket_path)
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600)
+        info = mcp_daemon.server_info(self.socket_path)
+        self.assertEqual(info['version'], mcp_daemon.source_fingerprint())
+        pid = open(self.socket_path + ".pid").read()
+        mcp_daemon.ensure_server(socket_path=self.socket_path)
+        self.assertEqual(open(self.socket_path + ".pid").read(), pid)
+        self.assertTrue(mcp_daemon.stop_server(self.socket_path))
+        self.assertIsNone(mcp_daemon.server_info(self.socket_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
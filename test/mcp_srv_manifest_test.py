@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+import importlib.util
+import asyncio
+import os
+import sys
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools")
+
+
+class TestMcpSrvManifest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the server imports the tool modules by their bare names, as when run from tools/;
+        # the path and those modules are only visible to this class
+        cls.patches = [mock.patch.object(sys, 'path', [TOOLS_DIR] + sys.path), mock.patch.dict(sys.modules)]
+        for patch in cls.patches:
+            patch.start()
+        spec = importlib.util.spec_from_file_location("mcp_srv", os.path.join(TOOLS_DIR, "mcp-srv.py"))
+        cls.mcp_srv = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(cls.mcp_srv)
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in reversed(cls.patches):
+            patch.stop()
+
+    def test_manifest_is_up_to_date(self):
+        # regenerate with: python tools/mcp-srv.py --write-manifest
+        self.assertEqual(self.mcp_srv.load_manifest(), self.mcp_srv.build_manifest())
+
+    def test_lazy_tool_imports_module_on_first_call(self):
+        entry = next(entry for entry in self.mcp_srv.load_manifest() if entry['name'] == 'read_file')
+        tool = self.mcp_srv.lazy_tool(entry)
+        result = asyncio.run(tool.run({'file_path': os.path.join(TOOLS_DIR, "mcp-srv.py"), 'end': 1}))
+        self.assertEqual(result, "import argparse\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
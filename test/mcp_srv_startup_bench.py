@@ -0,0 +1,54 @@
+"""
+Cold-start benchmark of tools/mcp-srv.py over stdio.
+
+Measures, for a fresh server process, the time until the MCP session is
+initialized and the tools are listed, and the latency of the first call to a
+lazily loaded tool.
+
+Usage: python test/mcp_srv_startup_bench.py [--runs 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+MCP_SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "mcp-srv.py")
+
+
+async def cold_start(script = MCP_SERVER_SCRIPT) -> dict:
+    start = time.perf_counter()
+    server = StdioServerParameters(command=sys.executable, args=[script])
+    async with stdio_client(server) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            initialized = time.perf_counter()
+            tools = await session.list_tools()
+            listed = time.perf_counter()
+            await session.call_tool("read_file", {"file_path": script, "end": 1})
+            called = time.perf_counter()
+    return {'initialize': initialized - start, 'list_tools': listed - start,
+        'first_lazy_call': called - listed, 'tools': len(tools.tools)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the MCP server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--script", default=MCP_SERVER_SCRIPT)
+    args = parser.parse_args()
+
+    runs = [asyncio.run(cold_start(args.script)) for _ in range(args.runs)]
+    report = {key: round(statistics.median(run[key] for run in runs), 3)
+        for key in ['initialize', 'list_tools', 'first_lazy_call']}
+    report['tools'] = runs[0]['tools']
+    report['runs'] = args.runs
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
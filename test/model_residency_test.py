@@ -0,0 +1,112 @@
+import unittest
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from tools.ollama_operations import OllamaClient
+from tools.model_residency import ModelResidencyManager, plan_stages, count_swaps
+
+GB = 1024 ** 3
+SIZES = {'qwen3:latest': 5 * GB, 'qwen3:1.7b': 2 * GB, 'qwen3:14b': 10 * GB}
+
+
+class OllamaStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    resident = {}
+    generates = []
+
+    def answer(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/api/ps':
+            self.answer({'models': [{'name': name, 'size': SIZES[name], 'size_vram': SIZES[name], 'expires_at': keep_alive}
+                for name, keep_alive in OllamaStub.resident.items()]})
+        else:
+            self.answer({'models': [{'name': name, 'size': size, 'digest': name} for name, size in SIZES.items()]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        name = body['model'] if ':' in body['model'] else body['model'] + ':latest'
+        OllamaStub.generates.append((name, body['keep_alive']))
+        if body['keep_alive'] == 0:
+            OllamaStub.resident.pop(name, None)
+            done_reason = 'unload'
+        else:
+            if name not in OllamaStub.resident:
+                time.sleep(0.02)
+            OllamaStub.resident[name] = body['keep_alive']
+            done_reason = 'load'
+        # what Ollama answers to a generate request without prompt
+        self.answer({'model': name, 'created_at': '2026-01-01T00:00:00Z', 'response': '', 'done': True,
+            'done_reason': done_reason})
+
+    def log_message(self, *args):
+        pass
+
+
+class ModelResidencyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OllamaStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        OllamaStub.resident = {}
+        OllamaStub.generates = []
+        self.manager = ModelResidencyManager(OllamaClient(self.host), keep_alive="1h")
+
+    def test_preload_sets_keep_alive_and_measures_loads(self):
+        records = self.manager.preload(['qwen3', 'qwen3:1.7b', 'qwen3'])
+        self.assertEqual([record['model'] for record in records], ['qwen3:latest', 'qwen3:1.7b'])
+        self.assertGreaterEqual(records[0]['seconds'], 0.02)
+        self.assertEqual(records[0]['size'], 5 * GB)
+        self.assertEqual(OllamaStub.resident, {'qwen3:latest': '1h', 'qwen3:1.7b': '1h'})
+        self.assertEqual(self.manager.preload(['qwen3']), [])
+        self.assertEqual(self.manager.memory_usage(), {'size': 7 * GB, 'size_vram': 7 * GB, 'models': 2})
+
+    def test_plan_groups_stages_by_model(self):
+        stages = [{'name': 'job', 'model': 'qwen3'},
+            {'name': 'keywords', 'model': 'qwen3:1.7b', 'after': ['job']},
+            {'name': 'cv', 'model': 'qwen3'},
+            {'name': 'topic', 'model': 'qwen3:1.7b'},
+            {'name': 'adapt', 'model': 'qwen3:14b', 'after': ['keywords', 'cv']}]
+        order = plan_stages(stages)
+        self.assertEqual([stage['name'] for stage in order], ['job', 'cv', 'keywords', 'topic', 'adapt'])
+        self.assertEqual(count_swaps(order), 3)
+        self.assertGreater(count_swaps(stages), count_swaps(order))
+        self.assertEqual(plan_stages(stages[2:4], loaded=['qwen3:1.7b'])[0]['name'], 'topic')
+        with self.assertRaises(ValueError):
+            plan_stages([{'name': 'a', 'model': 'qwen3', 'after': ['b']}, {'name': 'b', 'model': 'qwen3', 'after': ['a']}])
+
+    def test_run_unloads_models_to_fit_the_budget(self):
+        manager = ModelResidencyManager(OllamaClient(self.host), memory_budget=12 * GB)
+        stages = [{'name': 'small', 'model': 'qwen3:1.7b', 'run': lambda results: 'summary'},
+            {'name': 'medium', 'model': 'qwen3', 'after': ['small'], 'run': lambda results: results['small'] + ' checked'},
+            {'name': 'large', 'model': 'qwen3:14b', 'after': ['medium'], 'run': lambda results: results['medium'] + ' adapted'}]
+        results = manager.run(stages)
+        self.assertEqual(results['large'], 'summary checked adapted')
+        self.assertEqual([record['model'] for record in manager.loads], ['qwen3:1.7b', 'qwen3:latest', 'qwen3:14b'])
+        self.assertEqual(set(OllamaStub.resident), {'qwen3:14b'})
+        self.assertIn(('qwen3:1.7b', 0), OllamaStub.generates)
+
+    def test_needed_models_are_not_unloaded(self):
+        manager = ModelResidencyManager(OllamaClient(self.host), memory_budget=12 * GB)
+        manager.preload(['qwen3', 'qwen3:1.7b'])
+        manager.ensure('qwen3:14b', needed=('qwen3:14b', 'qwen3'))
+        self.assertEqual(set(OllamaStub.resident), {'qwen3:latest', 'qwen3:14b'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+import tempfile
+import os
+import zipfile
+from xml.dom import minidom
+from odf import teletype
+from odf.opendocument import OpenDocumentText
+from odf.text import H, P, Span, A, List, ListItem, S, Tab, LineBreak
+from odf.draw import Line
+from tools.odt_tools import OdtDocument, read_indexed_text, read_text
+
+
+def make_document(file_path, sections = 2):
+    doc = OpenDocumentText()
+    for n in range(sections):
+        doc.text.addElement(H(outlinelevel=1, text=f"Section {n}"))
+        paragraph = P(text="Intro ")
+        paragraph.addElement(Span(text="bold words"))
+        paragraph.addElement(S(c=3))
+        paragraph.addText("after spaces")
+        paragraph.addElement(Tab())
+        paragraph.addText("tabbed")
+        paragraph.addElement(LineBreak())
+        paragraph.addText("second line")
+        doc.text.addElement(paragraph)
+        link = P()
+        link.addElement(A(href=f"https://example.com/{n}", text="a link"))
+        doc.text.addElement(link)
+        items = List()
+        for i in range(2):
+            item = ListItem()
+            item.addElement(P(text=f"item {n}.{i}"))
+            items.addElement(item)
+        doc.text.addElement(items)
+        line = P()
+        line.addElement(Line(x1="0cm", y1="0cm", x2="1cm", y2="0cm"))
+        doc.text.addElement(line)
+        nested = P()
+        outer = Span(text="outer ")
+        outer.addElement(Span(text="inner"))
+        nested.addElement(outer)
+        doc.text.addElement(nested)
+    doc.save(file_path)
+
+
+class OdtToolsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, "cv.odt")
+        make_document(self.file_path)
+        self.document = OdtDocument(self.file_path)
+
+    def test_get_indexed_text(self):
+        text = self.document.get_indexed_text()
+        self.assertEqual(list(text.values())[:6], ["# Section 0", "Intro bold words   after spaces\ttabbed\nsecond line",
+            "[a link](https://example.com/0)", "- item 0.0", "- item 0.1", "---"])
+        self.assertEqual(text[2], "# Section 0")
+        self.assertEqual(self.document.get_indexed_text(markdown=False)[2], "Section 0")
+
+    def test_cached_text_matches_teletype(self):
+        self.document.get_indexed_text()
+        for node in self.document.get_indexed_elements().values():
+            self.assertEqual(self.document._node_text(node), teletype.extractText(node))
+
+    def test_replace_updates_the_index(self):
+        text = self.document.get_indexed_text()
+        first, last = list(text)[1], list(text)[-1]
+        self.document.replace({first: "New **bold** text", last: "Last line"})
+        updated = self.document.get_indexed_text()
+        self.assertEqual(updated[first], "New bold text")
+        self.assertEqual(list(updated.values())[-1], "Last line")
+        self.assertIn("New bold text", self.document.get_text())
+        node = self.document.get_indexed_elements()[first]
+        self.assertEqual(self.document.index_of(node), first)
+
+        # the index of the edited document is the one of the same document loaded again
+        self.document.save(os.path.join(self.folder, "adapted.odt"))
+        reloaded = OdtDocument(os.path.join(self.folder, "adapted.odt"))
+        self.assertEqual(list(reloaded.get_indexed_text().items()), list(updated.items()))
+
+    def test_iter_nodes_prunes_and_stops_early(self):
+        visited = []
+        headings = []
+        for _, node in self.document.iter_nodes(prune={'text:p', 'text:list'}):
+            visited.append(node)
+            if node.tagName == 'text:h':
+                headings.append(node)
+                if len(headings) == 2:
+                    break
+        self.assertEqual([self.document._node_text(node) for node in headings], ["Section 0", "Section 1"])
+        self.assertNotIn('text:span', [node.tagName for node in visited])
+        # the flat index is not built, so the skipped spans were never visited
+        self.assertIsNone(self.document._elements)
+        # index_of gives the indices of the indexed methods, so the headings can be edited
+        indices = [self.document.index_of(node) for node in headings]
+        text = self.document.get_indexed_text()
+        self.assertEqual([text[index] for index in indices], ["# Section 0", "# Section 1"])
+        self.assertEqual(list(self.document.replace({index: "New" for index in indices}).values()), ["replaced"] * 2)
+
+    def test_iter_nodes_prunes_with_the_built_index(self):
+        text = self.document.get_indexed_text()
+        headings = [index for index, node in self.document.iter_nodes(prune={'text:p', 'text:list'}) if node.tagName == 'text:h']
+        self.assertEqual(headings, [index for index, line in text.items() if line.startswith('# ')])
+
+    def test_deeply_nested_document(self):
+        paragraph = P()
+        self.document.document.text.addElement(paragraph)
+        node = paragraph
+        for _ in range(5000):
+            span = Span()
+            node.addElement(span)
+            node = span
+        node.addText("deep text")
+        self.document._elements = None
+        nodes = list(self.document.iter_nodes())
+        self.assertIs(nodes[-1][1].parentNode, node)
+        self.assertEqual(nodes[-1][0], len(nodes) - 1)
+        self.assertEqual(list(self.document.get_indexed_text().values())[-1], "deep text")
+
+    def test_replace_reports_every_index(self):
+        text = self.document.get_indexed_text()
+        paragraph = list(text)[1]
+        inside = paragraph + 1
+        report = self.document.replace({paragraph: "**Bold** start", inside: "ignored", 10 ** 6: "missing", "3": "bad key"})
+        self.assertEqual(report, {paragraph: "replaced", inside: f"inside replaced element {paragraph}",
+            10 ** 6: "not found", "3": "not found"})
+        self.assertEqual(self.document.get_indexed_text()[paragraph], "Bold start")
+        bold = [style for style in self.document.document.styles.childNodes if style.getAttribute("name") == "Bold"]
+        self.assertEqual(len(bold), 1)
+        for node in self.document.get_indexed_elements().values():
+            self.assertEqual(self.document._node_text(node), teletype.extractText(node))
+
+    def test_read_indexed_text_matches_the_loaded_document(self):
+        for markdown in (True, False):
+            self.assertEqual(list(read_indexed_text(self.file_path, markdown).items()),
+                list(self.document.get_indexed_text(markdown).items()))
+        self.assertEqual(read_text(self.file_path), self.document.get_text())
+
+    def test_read_indexed_text_counts_whitespace_text_nodes(self):
+        # indented content.xml: the whitespace between tags is loaded as text nodes
+        pretty_path = os.path.join(self.folder, "pretty.odt")
+        with zipfile.ZipFile(self.file_path) as source, zipfile.ZipFile(pretty_path, 'w') as target:
+            for item in source.infolist():
+                data = source.read(item.filename)
+                if item.filename == 'content.xml':
+                    data = minidom.parseString(data).toprettyxml(indent="  ").replace("Intro ", "Intro &amp; ").encode()
+                target.writestr(item, data)
+        expected = OdtDocument(pretty_path).get_indexed_text()
+        self.assertNotEqual(list(expected), list(self.document.get_indexed_text()))
+        self.assertEqual(list(read_indexed_text(pretty_path).items()), list(expected.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import asyncio
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from tools.ollama_operations import OllamaClient
+
+
+class OllamaStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    connections = set()
+    digest = "sha256:aaa"
+
+    def answer(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        OllamaStub.requests.append(self.path)
+        OllamaStub.connections.add(self.client_address)
+        if self.path == '/api/ps':
+            self.answer({'models': [{'name': 'qwen3:latest', 'size_vram': 1024}]})
+        else:
+            self.answer({'models': [{'name': 'qwen3:latest', 'model': 'qwen3:latest', 'digest': OllamaStub.digest}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        OllamaStub.requests.append(f"{self.path} {body['model']}")
+        OllamaStub.connections.add(self.client_address)
+        self.answer({'parameters': 'num_ctx 8192', 'model_info': {'qwen3.context_length': 40960}, 'digest': OllamaStub.digest})
+
+    def log_message(self, *args):
+        pass
+
+
+class OllamaOperationsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OllamaStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        OllamaStub.requests = []
+        OllamaStub.connections = set()
+        OllamaStub.digest = "sha256:aaa"
+
+    def test_ps_is_cached_for_the_ttl(self):
+        client = OllamaClient(self.host, ps_ttl=60)
+        for _ in range(5):
+            self.assertEqual(client.ps()['models'][0]['name'], 'qwen3:latest')
+        self.assertEqual(OllamaStub.requests, ['/api/ps'])
+        client = OllamaClient(self.host, ps_ttl=0)
+        client.ps()
+        client.ps()
+        self.assertEqual(OllamaStub.requests.count('/api/ps'), 3)
+
+    def test_show_is_cached_per_digest(self):
+        client = OllamaClient(self.host, tags_ttl=0)
+        client.show('qwen3')
+        details = client.show('qwen3')
+        details['parameters'] = 'modified by the caller'
+        self.assertEqual(client.show('qwen3')['parameters'], 'num_ctx 8192')
+        self.assertEqual(OllamaStub.requests.count('/api/show qwen3'), 1)
+        OllamaStub.digest = "sha256:bbb"
+        self.assertEqual(client.show('qwen3')['digest'], "sha256:bbb")
+        self.assertEqual(OllamaStub.requests.count('/api/show qwen3'), 2)
+
+    def test_connections_are_reused(self):
+        client = OllamaClient(self.host, ps_ttl=0, tags_ttl=0)
+        for _ in range(5):
+            client.ps()
+            client.tags()
+        self.assertEqual(len(OllamaStub.requests), 10)
+        self.assertEqual(len(OllamaStub.connections), 1)
+
+    def test_async_client(self):
+        client = OllamaClient(self.host, ps_ttl=60)
+
+        async def check():
+            results = await asyncio.gather(client.aps(), client.ashow('qwen3'))
+            self.assertEqual(results[1]['model_info']['qwen3.context_length'], 40960)
+            await client.ashow('qwen3')
+            return results
+
+        asyncio.run(check())
+        self.assertEqual(OllamaStub.requests.count('/api/show qwen3'), 1)
+        self.assertEqual(client.ps()['models'][0]['size_vram'], 1024)
+        self.assertEqual(OllamaStub.requests.count('/api/ps'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
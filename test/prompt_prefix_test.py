@@ -0,0 +1,60 @@
+import unittest
+import io
+import json
+import uuid
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.tools import tool
+from tools.prompt_prefix import PrefixStats, stable_tools, common_prefix
+
+
+@tool
+def write_file(path: str, content: str) -> str:
+    """Writes a file."""
+    return path
+
+
+@tool
+def execute_bash(command: str) -> str:
+    """Runs a command."""
+    return command
+
+
+class PromptPrefixTest(unittest.TestCase):
+
+    def test_stable_tools_do_not_depend_on_the_listing_order(self):
+        first = json.dumps(stable_tools([write_file, execute_bash]))
+        second = json.dumps(stable_tools([execute_bash, write_file]))
+        self.assertEqual(first, second)
+        self.assertEqual([t['function']['name'] for t in json.loads(first)], ['execute_bash', 'write_file'])
+
+    def test_common_prefix(self):
+        self.assertEqual(common_prefix("abcdef", "abcxyz"), 3)
+        self.assertEqual(common_prefix("abc", "abcdef"), 3)
+        self.assertEqual(common_prefix("", "abc"), 0)
+
+    def call(self, stats, messages, prompt_eval_count):
+        run_id = uuid.uuid4()
+        stats.on_chat_model_start({}, [messages], run_id=run_id, invocation_params={'tools': stable_tools([execute_bash])})
+        generation = ChatGeneration(message=AIMessage(content="ok"),
+            generation_info={'prompt_eval_count': prompt_eval_count, 'prompt_eval_duration': 10_000_000, 'eval_count': 2})
+        stats.on_llm_end(LLMResult(generations=[[generation]]), run_id=run_id)
+        return stats.calls[-1]
+
+    def test_stats_report_prefill_and_reused_tokens(self):
+        output = io.StringIO()
+        stats = PrefixStats(file=output)
+        messages = [SystemMessage(content="system prompt " * 50), HumanMessage(content="list the files")]
+        cold = self.call(stats, messages, 300)
+        self.assertEqual((cold['prompt_tokens'], cold['reused_tokens'], cold['reused_chars']), (300, 0, 0))
+        messages = messages + [AIMessage(content="a.txt b.txt"), HumanMessage(content="now read a.txt")]
+        warm = self.call(stats, messages, 20)
+        self.assertGreater(warm['reused_chars'], cold['prompt_chars'] * 0.8)
+        self.assertEqual(warm['prefill_tokens'], 20)
+        self.assertGreater(warm['reused_tokens'], 250)
+        self.assertEqual(stats.summary()['prefill_tokens'], 320)
+        self.assertIn("reused:", output.getvalue().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import tempfile
+import os
+import threading
+import time
+from langchain_core.messages import AIMessage
+from tools.web_cache import WebCache
+from tools.llm_cache import LLMCache
+from tools.summarize import MapReduceSummarizer, split_text, estimate_tokens
+
+TEXT = "\n".join(f"Paragraph {i} explains one more detail about local models and their context windows." for i in range(200))
+
+
+class FakeChatModel:
+
+    def __init__(self, num_ctx = 1024, answer = None):
+        self.model = "qwen3"
+        self.num_ctx = num_ctx
+        self.answer = answer
+        self.requests = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, messages, config = None):
+        with self.lock:
+            self.requests.append(messages)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return AIMessage(content=self.answer or f"summary of {len(messages[1].content)} chars")
+
+
+class SummarizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = LLMCache(WebCache(db_path=os.path.join(tempfile.mkdtemp(), "llm.db"), namespace='llm'))
+
+    def test_split_text_respects_the_budget(self):
+        chunks = split_text(TEXT + "\n" + "word " * 2000, 200)
+        self.assertTrue(all(estimate_tokens(chunk) <= 201 for chunk in chunks))
+        self.assertEqual(" ".join(" ".join(chunks).split()), " ".join((TEXT + "\n" + "word " * 2000).split()))
+
+    def test_short_text_is_one_request(self):
+        llm = FakeChatModel(num_ctx=8192)
+        MapReduceSummarizer(llm, cache=self.cache).summarize("A short page about models.")
+        self.assertEqual(len(llm.requests), 1)
+
+    def test_long_text_is_mapped_in_parallel_and_reduced(self):
+        llm = FakeChatModel(num_ctx=1024)
+        summarizer = MapReduceSummarizer(llm, words=50, max_workers=4, cache=self.cache)
+        summary = summarizer.summarize(TEXT)
+        self.assertTrue(summary.startswith("summary of"))
+        chunks = split_text(TEXT, summarizer.chunk_tokens)
+        self.assertGreater(len(chunks), 4)
+        self.assertGreater(len(llm.requests), len(chunks))
+        self.assertTrue(all(estimate_tokens(m[1].content) <= summarizer.chunk_tokens for m in llm.requests))
+        self.assertGreater(llm.max_running, 1)
+        self.assertLessEqual(llm.max_running, 4)
+
+    def test_long_partial_summaries_do_not_overflow_the_reduce(self):
+        # a model that ignores the word limit and answers with a whole chunk
+        llm = FakeChatModel(num_ctx=1024, answer="verbose " * 400)
+        summarizer = MapReduceSummarizer(llm, words=50, cache=self.cache)
+        summarizer.summarize(TEXT)
+        self.assertTrue(all(estimate_tokens(m[1].content) <= summarizer.chunk_tokens for m in llm.requests))
+
+    def test_chunk_size_follows_the_context_length(self):
+        small = MapReduceSummarizer(FakeChatModel(num_ctx=2048), cache=self.cache)
+        large = MapReduceSummarizer(FakeChatModel(num_ctx=32768), cache=self.cache)
+        self.assertGreater(large.chunk_tokens, small.chunk_tokens * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import tempfile
+import os
+from tools.table_cache import TableCache
+
+
+class TestTableCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp.name, "projects.csv")
+        self.write("tag,name\nP1,first\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, content):
+        with open(self.file_path, 'w') as f:
+            f.write(content)
+
+    def test_records_are_reused_while_file_is_unchanged(self):
+        cache = TableCache()
+        records = cache.records(self.file_path)
+        self.assertEqual(records, [{'tag': 'P1', 'name': 'first'}])
+        self.assertIs(cache.records(self.file_path), records)
+
+    def test_changed_file_is_parsed_again(self):
+        cache = TableCache()
+        cache.records(self.file_path)
+        self.write("tag,name\nP1,first\nP2,second\n")
+        self.assertEqual(len(cache.records(self.file_path)), 2)
+
+    def test_replaced_file_is_parsed_again(self):
+        cache = TableCache()
+        cache.records(self.file_path)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write("tag,name\nP3,third\n")
+        os.replace(tmp_path, self.file_path)
+        self.assertEqual(cache.records(self.file_path)[0]['tag'], 'P3')
+
+
+if __name__ == '__main__':
+    unittest.main()
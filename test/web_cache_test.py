@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+import os
+import time
+from tools.web_cache import WebCache
+
+
+class TestWebCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "web_cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_and_persistence(self):
+        cache = WebCache(self.db_path)
+        cache.set("https://example.com", [{'page_content': 'hello'}])
+        self.assertEqual(cache.get("https://example.com"), [{'page_content': 'hello'}])
+        self.assertIsNone(cache.get("https://example.org"))
+        self.assertEqual(WebCache(self.db_path).get("https://example.com"), [{'page_content': 'hello'}])
+
+    def test_max_age(self):
+        cache = WebCache(self.db_path)
+        cache.set("key", "value")
+        self.assertIsNone(cache.get("key", max_age_hours=0))
+        self.assertIsNone(WebCache(self.db_path).get("key", max_age_hours=0))
+        self.assertEqual(cache.get("key", max_age_hours=1), "value")
+
+    def test_memory_hits_return_copies(self):
+        cache = WebCache(self.db_path)
+        cache.set("key", {'metadata': {}})
+        cache.get("key")['metadata']['summary'] = 'changed'
+        self.assertEqual(cache.get("key"), {'metadata': {}})
+
+    def test_disk_tier_is_bounded_lru(self):
+        cache = WebCache(self.db_path, max_bytes=5000, memory_bytes=0)
+        for i in range(10):
+            cache.set(f"page{i}", os.urandom(1000))
+            if i >= 1:
+                # keep page0 recently used
+                time.sleep(0.001)
+                self.assertIsNotNone(cache.get("page0"))
+        self.assertLessEqual(sum(size for size, in cache.connection.execute("SELECT size FROM entries")), 5000)
+        self.assertIsNotNone(cache.get("page0"))
+        self.assertIsNone(cache.get("page1"))
+        self.assertIsNotNone(cache.get("page9"))
+
+    def test_memory_hits_keep_disk_entries_recent(self):
+        cache = WebCache(self.db_path, max_bytes=5000)
+        for i in range(10):
+            cache.set(f"page{i}", os.urandom(1000))
+            if i >= 1:
+                time.sleep(0.001)
+                self.assertIsNotNone(cache.get("page0"))
+        self.assertIsNotNone(cache.get("page0"))
+        self.assertIsNotNone(WebCache(self.db_path).get("page0"))
+        self.assertIsNone(cache.get("page1"))
+
+    def test_delete(self):
+        cache = WebCache(self.db_path)
+        cache.set("key", "value")
+        cache.delete("key")
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(len(cache), 0)
+
+    def test_namespaces_are_independent(self):
+        pages = WebCache(self.db_path, namespace='page')
+        searches = WebCache(self.db_path, namespace='search')
+        pages.set("key", "page")
+        self.assertIsNone(searches.get("key"))
+        searches.clear()
+        self.assertEqual(pages.get("key"), "page")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import unittest
+import tempfile
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from bs4 import BeautifulSoup
+
+os.environ.setdefault('WEB_CACHE_PATH', os.path.join(tempfile.mkdtemp(), "web_cache.db"))
+from tools import web_operations
+
+PAGE = """<html lang="en"><head><title>Page {path}</title></head><body>
+<p>short line</p>
+<p>This line has more than five words in it, see https://example.com/docs</p>
+</body></html>"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        PageHandler.requests.append(self.path)
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        time.sleep(0.3)
+        body = PAGE.format(path=self.path).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWebOperations(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        PageHandler.requests = []
+        web_operations.page_cache.clear()
+        web_operations.search_cache.clear()
+        web_operations.seen_documents.clear()
+        self.searches = []
+        self.search_backend = web_operations.search_backend
+        web_operations.search_backend = self.fake_search
+
+    def tearDown(self):
+        web_operations.search_backend = self.search_backend
+
+    def fake_search(self, query, num_results):
+        self.searches.append(query)
+        time.sleep(0.2)
+        words = query.split()
+        return [{'title': word, 'href': f"https://example.com/{word}", 'body': query} for word in words][:num_results]
+
+    def test_html_to_document(self):
+        doc = web_operations.html_to_document("https://example.com", PAGE.format(path='/a'), extract_links=True)
+        self.assertEqual(doc.metadata['title'], "Page /a")
+        self.assertEqual(doc.metadata['language'], "en")
+        self.assertEqual(doc.metadata['links'], ["https://example.com/docs"])
+        self.assertEqual(doc.page_content, "This line has more than five words in it, see https://example.com/docs")
+
+    def test_extract_text_matches_get_text_filtering(self):
+        html = """<html><body><script>var a = 1 + 2 + 3 + 4 + 5;</script>
+        <div>one <b>two</b> three
+        four five six <a href="#">see https://example.com/a/b</a> seven</div>
+        <p>tiny</p><p>a line that is long enough to keep</p></body></html>"""
+        soup = BeautifulSoup(html, "html.parser")
+        expected = [line.strip() for line in soup.get_text().split('\n') if len(line.strip().split()) >= 5]
+        text, links = web_operations.extract_text(soup, extract_links=True)
+        self.assertEqual(text, '\n'.join(expected))
+        self.assertEqual(links, ["https://example.com/a/b"])
+
+    def test_extract_text_stops_at_max_chars(self):
+        html = "<div>" + "<p>this line has exactly six words</p>\n" * 1000 + "</div>"
+        text, _ = web_operations.extract_text(BeautifulSoup(html, "html.parser"), max_chars=100)
+        self.assertEqual(len(text), 100)
+
+    def test_scrape_webpages_batch_runs_concurrently(self):
+        urls = [f"{self.base_url}/page{i}" for i in range(6)] + [f"{self.base_url}/missing"]
+        start = time.time()
+        docs = web_operations.scrape_webpages_batch.invoke(input={'urls': urls})
+        self.assertLess(time.time() - start, 6 * 0.3)
+        self.assertEqual([doc.metadata['source'] for doc in docs], urls)
+        self.assertEqual(docs[0].metadata['title'], "Page /page0")
+        self.assertIn('404', docs[-1].metadata['error'])
+
+    def test_scrape_webpages_batch_deduplicates(self):
+        urls = [f"{self.base_url}/copy{i}" for i in range(3)] + [f"{self.base_url}/missing"]
+        docs = web_operations.scrape_webpages_batch.invoke(input={'urls': urls, 'deduplicate': True})
+        self.assertEqual([doc.metadata['source'] for doc in docs], urls)
+        self.assertEqual(docs[0].metadata['duplicates'], urls[1:3])
+        self.assertEqual([doc.metadata.get('duplicate_of') for doc in docs], [None, urls[0], urls[0], None])
+        self.assertEqual(docs[1].page_content, '')
+        # a later round gets a stub for the copies of the pages returned before,
+        # and the documents already returned are left as they were
+        later = web_operations.scrape_webpages_batch.invoke(input={'urls': [f"{self.base_url}/copy9"], 'deduplicate': True})
+        self.assertEqual([doc.metadata for doc in later], [{'source': f"{self.base_url}/copy9", 'duplicate_of': urls[0]}])
+        self.assertEqual(docs[0].metadata['duplicates'], urls[1:3])
+
+    def test_scrape_webpages_batch_uses_cache(self):
+        urls = [f"{self.base_url}/page{i}" for i in range(2)]
+        web_operations.scrape_webpages_batch.invoke(input={'urls': urls})
+        web_operations.scrape_webpages_batch.invoke(input={'urls': urls})
+        self.assertEqual(len(PageHandler.requests), 2)
+
+    def test_cache_depends_on_extraction_options(self):
+        url = f"{self.base_url}/options"
+        short = web_operations.scrape_webpages.invoke(input={'url': url, 'max_chars': 20})
+        full = web_operations.scrape_webpages.invoke(input={'url': url, 'max_chars': None, 'extract_links': True})
+        self.assertEqual(len(short[0].page_content), 20)
+        self.assertGreater(len(full[0].page_content), 20)
+        self.assertEqual(full[0].metadata['links'], ["https://example.com/docs"])
+        web_operations.scrape_webpages.invoke(input={'url': url, 'max_chars': 20})
+        self.assertEqual(PageHandler.requests, ['/options', '/options'])
+
+    def test_unreadable_cache_entry_is_a_miss(self):
+        url = f"{self.base_url}/corrupt"
+        web_operations.scrape_webpages.invoke(input={'url': url})
+        web_operations.page_cache.connection.execute("UPDATE entries SET body = ? WHERE key = ?",
+            (b'not zlib', web_operations.page_key(url, False, 5, web_operations.MAX_PAGE_CHARS)))
+        web_operations.page_cache._memory.clear()
+        docs = web_operations.scrape_webpages.invoke(input={'url': url})
+        self.assertEqual(docs[0].metadata['title'], "Page /corrupt")
+        self.assertEqual(PageHandler.requests, ['/corrupt', '/corrupt'])
+
+    def test_concurrent_scrapes_of_the_same_url_download_once(self):
+        url = f"{self.base_url}/shared"
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            docs = list(executor.map(lambda _: web_operations.scrape_webpages.invoke(input={'url': url}), range(6)))
+        self.assertEqual(PageHandler.requests, ['/shared'])
+        self.assertTrue(all(d[0].page_content == docs[0][0].page_content for d in docs))
+        docs[1][0].metadata['summary'] = 'changed'
+        self.assertNotIn('summary', docs[2][0].metadata)
+
+    def test_concurrent_batches_share_the_flight(self):
+        url = f"{self.base_url}/shared"
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(web_operations.scrape_webpages_batch.invoke, input={'urls': [url, url]})
+            second = executor.submit(web_operations.scrape_webpages_batch.invoke, input={'urls': [url]})
+            self.assertEqual(first.result()[0].page_content, second.result()[0].page_content)
+        self.assertEqual(PageHandler.requests, ['/shared'])
+
+    def test_web_search_cache_normalizes_queries(self):
+        first = web_operations.web_search.invoke(input={'query': 'langchain ollama'})
+        second = web_operations.web_search.invoke(input={'query': '  LangChain   Ollama '})
+        self.assertEqual(first, second)
+        self.assertEqual(self.searches, ['langchain ollama'])
+        web_operations.web_search.invoke(input={'query': 'langchain ollama', 'cache_time': 0})
+        self.assertEqual(len(self.searches), 2)
+
+    def test_unreadable_search_cache_entry_is_a_miss(self):
+        web_operations.web_search.invoke(input={'query': 'langchain ollama'})
+        web_operations.search_cache.connection.execute("UPDATE entries SET body = ? WHERE namespace = 'search'", (b'not zlib',))
+        web_operations.search_cache._memory.clear()
+        results = web_operations.web_search.invoke(input={'query': 'langchain ollama'})
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.searches, ['langchain ollama', 'langchain ollama'])
+
+    def test_web_search_batch_runs_concurrently_and_deduplicates(self):
+        start = time.time()
+        results = web_operations.web_search_batch.invoke(input={'queries': ['a b', 'b c', 'c d', 'a b']})
+        self.assertLess(time.time() - start, 3 * 0.2)
+        self.assertEqual([result['href'] for result in results],
+            [f"https://example.com/{word}" for word in 'abcd'])
+        self.assertEqual(results[2]['query'], 'b c')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,17 @@
+"""Helpers to run coroutines from synchronous code."""
+
+import asyncio
+import threading
+
+
+def run_coroutine_sync(coroutine):
+    """Run a coroutine to completion, also from code already running inside an event loop (notebooks)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=asyncio.run(coroutine)))
+    thread.start()
+    thread.join()
+    return result['value']
@@ -0,0 +1,19 @@
+"""Inter-process file locking."""
+
+from contextlib import contextmanager
+import fcntl
+
+
+@contextmanager
+def locked_file(file_path, shared = False):
+    """
+    Hold an fcntl lock on file_path + '.lock' while the block runs.
+    Use shared=True for readers and the default exclusive lock for writers.
+    """
+    with open(file_path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
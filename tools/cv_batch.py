@@ -0,0 +1,142 @@
+"""Batch adaptation of ODT resumes: ODT work in a process pool, LLM calls overlapped in an async queue."""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
+import inspect
+import os
+import time
+
+try:
+    from tools.odt_tools import OdtDocument, read_indexed_text
+    from tools.async_utils import run_coroutine_sync
+except ImportError:
+    from odt_tools import OdtDocument, read_indexed_text
+    from async_utils import run_coroutine_sync
+
+
+def read_resume(file_path) -> dict[int:str]:
+    """
+    Indexed markdown text of a resume (runs in a worker process).
+    """
+    return read_indexed_text(file_path)
+
+
+def write_resume(file_path, replacements: dict[int:str], output_path) -> dict[int:str]:
+    """
+    Apply the replacements to the resume and save it to output_path (runs in a
+    worker process). Returns the report of OdtDocument.replace.
+    """
+    document = OdtDocument(file_path)
+    report = document.replace(replacements)
+    document.save(output_path)
+    return report
+
+
+class CVBatchConverter:
+    """
+    Adapts every .odt resume of a folder to a job offer.
+
+    adapt(indexed_text, job_offer) returns the {index: new text} replacements of
+    one resume, like the LLM steps of resumee_research.ipynb; it may be a plain
+    function or a coroutine function. Any other answer (e.g. None when the LLM
+    failed) fails the resume at the adapt stage. Reading and saving the documents runs in a
+    process pool, so it scales with the cores, while up to llm_concurrency
+    adaptations run at the same time from an async queue: a resume is adapted
+    while others are still being read or saved.
+
+    Every resume gets a report {file, output, status ('done' or 'failed'),
+    stage, error, replaced, seconds}, passed to on_progress as soon as it
+    finishes; a failure only stops its own resume.
+    """
+
+    def __init__(self, adapt: Callable, llm_concurrency = 2, max_workers: Optional[int] = None,
+        on_progress: Optional[Callable[[dict], Any]] = None):
+        self.adapt = adapt
+        self.llm_concurrency = llm_concurrency
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.on_progress = on_progress or self.print_progress
+
+    @staticmethod
+    def print_progress(report: dict):
+        if report['status'] == 'done':
+            print(f"{report['file']}: {report['replaced']} replacements saved to {report['output']} ({report['seconds']:.1f}s)")
+        else:
+            print(f"{report['file']}: failed at {report['stage']}: {report['error']}")
+
+    async def _adapt(self, indexed_text, job_offer) -> dict:
+        if inspect.iscoroutinefunction(self.adapt):
+            replacements = await self.adapt(indexed_text, job_offer)
+        else:
+            replacements = await asyncio.to_thread(self.adapt, indexed_text, job_offer)
+        if not isinstance(replacements, dict):
+            raise TypeError(f"adapt returned {type(replacements).__name__}, expected a dict {{index: text}}")
+        return replacements
+
+    async def aconvert(self, input_folder, job_offer, output_folder) -> list[dict]:
+        files = sorted(name for name in os.listdir(input_folder) if name.endswith('.odt'))
+        os.makedirs(output_folder, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        reports = {}
+        completed = []
+
+        def finish(report, stage = None, error = None):
+            report.update(status='failed' if error else 'done', stage=stage, error=error,
+                seconds=time.perf_counter() - report.pop('start'))
+            completed.append(report)
+            # a failing callback must not stop the workers of the other resumes
+            try:
+                self.on_progress(report)
+            except Exception as e:
+                print(f"Error reporting progress of {report['file']}: {e}")
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+
+            async def read(name):
+                report = reports[name] = {'file': name, 'output': os.path.join(output_folder, name), 'replaced': 0,
+                    'start': time.perf_counter()}
+                try:
+                    indexed_text = await loop.run_in_executor(pool, read_resume, os.path.join(input_folder, name))
+                except Exception as e:
+                    return finish(report, 'read', str(e))
+                await queue.put((name, indexed_text))
+
+            async def write(name, replacements):
+                report = reports[name]
+                try:
+                    result = await loop.run_in_executor(pool, write_resume, os.path.join(input_folder, name),
+                        replacements, report['output'])
+                except Exception as e:
+                    return finish(report, 'save', str(e))
+                report['replaced'] = sum(1 for status in result.values() if status == 'replaced')
+                finish(report)
+
+            async def adapter(saves):
+                while True:
+                    name, indexed_text = await queue.get()
+                    try:
+                        replacements = await self._adapt(indexed_text, job_offer)
+                    except Exception as e:
+                        finish(reports[name], 'adapt', str(e))
+                    else:
+                        saves.append(asyncio.create_task(write(name, replacements)))
+                    finally:
+                        queue.task_done()
+
+            saves = []
+            adapters = [asyncio.create_task(adapter(saves)) for _ in range(self.llm_concurrency)]
+            await asyncio.gather(*(read(name) for name in files))
+            await queue.join()
+            for task in adapters:
+                task.cancel()
+            await asyncio.gather(*saves)
+
+        return sorted(completed, key=lambda report: report['file'])
+
+    def convert(self, input_folder, job_offer, output_folder) -> list[dict]:
+        """
+        Adapt the resumes of input_folder and save them with the same names in
+        output_folder. Returns the reports sorted by file name.
+        """
+        return run_coroutine_sync(self.aconvert(input_folder, job_offer, output_folder))
@@ -0,0 +1,134 @@
+"""Exact and near-duplicate detection of scraped documents (content hash + MinHash LSH)."""
+
+from typing import Optional
+import hashlib
+import random
+import re
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash of the words of the text, insensitive to case, punctuation and spacing.
+    """
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+def shingles(text: str, size = 5) -> set[int]:
+    """
+    Set of hashed word n-grams of the text.
+    """
+    words = normalize_text(text).split()
+    if len(words) < size:
+        words = words + [''] * (size - len(words))
+    return {int.from_bytes(hashlib.blake2b(' '.join(words[i:i + size]).encode(), digest_size=8).digest(), 'little')
+        for i in range(len(words) - size + 1)}
+
+
+class DocumentDeduplicator:
+    """
+    Remembers the documents it has seen and finds exact copies (same content hash)
+    and near-duplicates (MinHash estimate of the shingle Jaccard similarity above
+    threshold). Candidates are found with locality-sensitive hashing: the signature
+    is split in bands and documents sharing a band are compared.
+    """
+
+    def __init__(self, threshold = 0.8, num_perm = 64, bands = 16, shingle_size = 5, seed = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        generator = random.Random(seed)
+        self._permutations = [(generator.randrange(1, MERSENNE_PRIME), generator.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)]
+        self._hashes = {}
+        self._signatures = []
+        self._documents = []
+        self._buckets = {}
+
+    def signature(self, text: str) -> tuple:
+        values = shingles(text, self.shingle_size)
+        return tuple(min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in values)
+            for a, b in self._permutations)
+
+    def similarity(self, first: tuple, second: tuple) -> float:
+        return sum(1 for x, y in zip(first, second) if x == y) / self.num_perm
+
+    def _bands(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def find(self, text: str):
+        """
+        Return (index of the seen document it duplicates or None, hash, signature).
+        """
+        digest = content_hash(text)
+        if digest in self._hashes:
+            return self._hashes[digest], digest, None
+        signature = self.signature(text)
+        candidates = {index for key in self._bands(signature) for index in self._buckets.get(key, ())}
+        for index in sorted(candidates):
+            if self.similarity(signature, self._signatures[index]) >= self.threshold:
+                return index, digest, signature
+        return None, digest, signature
+
+    def add(self, document) -> Optional[object]:
+        """
+        Register a document. Returns the previously seen document it duplicates,
+        or None when it is new.
+        """
+        index, digest, signature = self.find(document.page_content)
+        if index is not None:
+            return self._documents[index]
+        index = len(self._documents)
+        self._documents.append(document)
+        self._signatures.append(signature)
+        self._hashes[digest] = index
+        for key in self._bands(signature):
+            self._buckets.setdefault(key, []).append(index)
+        return None
+
+    def clear(self):
+        self._hashes.clear()
+        self._signatures.clear()
+        self._documents.clear()
+        self._buckets.clear()
+
+    def deduplicate(self, documents, stubs = False) -> list:
+        """
+        Return the documents that were not seen before. The source of every dropped
+        copy is added to metadata['duplicates'] of the document it duplicates when
+        that document is in the same list; documents of earlier calls, already
+        handed out, are not modified. With stubs, every dropped copy is replaced by
+        an empty document with metadata {'source', 'duplicate_of'}.
+        Empty documents (failed pages) are always kept.
+        """
+        unique = []
+        current = set()
+        for document in documents:
+            if not document.page_content.strip():
+                unique.append(document)
+                continue
+            original = self.add(document)
+            if original is None:
+                unique.append(document)
+                current.add(id(document))
+                continue
+            if id(original) in current:
+                original.metadata.setdefault('duplicates', []).append(document.metadata.get('source'))
+            if stubs:
+                unique.append(type(document)(page_content='', metadata={'source': document.metadata.get('source'),
+                    'duplicate_of': original.metadata.get('source')}))
+        return unique
+
+
+def deduplicate_documents(documents, threshold = 0.8) -> list:
+    return DocumentDeduplicator(threshold=threshold).deduplicate(documents)
@@ -0,0 +1,223 @@
+"""Append-only email storage backed by an embedded SQLite table."""
+
+from typing import Optional
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+EMAIL_FIELDS = ['date', 'from_email', 'to_email', 'tags', 'subject', 'body']
+# an email is pending until it has at least two tags (project and reason)
+UNTAGGED = "tags IS NULL OR instr(tags, ',') = 0"
+
+
+class EmailStore:
+    """
+    Stores the emails of the workfolder in a SQLite table.
+
+    New emails are appended with an INTEGER PRIMARY KEY, so the id allocation
+    and the insert cost do not depend on the size of the mailbox. The first time
+    the store is opened, an existing emails.csv is imported keeping its ids;
+    afterwards the CSV is not updated, the database is the only source of truth.
+
+    Emails with less than two tags are kept in the pending table, ordered by
+    priority and then by arrival, so the next email to process is an index lookup.
+
+    Writes are serialized between processes by SQLite and grouped inside a
+    process: threads waiting for the connection have their writes committed
+    together by the thread that holds it, in a single transaction.
+    """
+
+    def __init__(self, db_path, csv_path = None):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._queue = []
+        self.connection = self.connect(db_path)
+        self.import_csv(csv_path)
+
+    def connect(self, db_path):
+        """
+        Open the database, create the schema and return the connection.
+        """
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS emails (
+                id INTEGER PRIMARY KEY,
+                date TEXT, from_email TEXT, to_email TEXT, tags TEXT, subject TEXT, body TEXT);
+            CREATE TABLE IF NOT EXISTS imports (path TEXT PRIMARY KEY, rows INTEGER);
+        """)
+        has_queue = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pending'").fetchone()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS pending (email_id INTEGER PRIMARY KEY, priority INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS pending_order ON pending (priority DESC, email_id);
+        """)
+        if not has_queue:
+            # databases created before the queue existed
+            connection.execute(f"INSERT OR IGNORE INTO pending (email_id) SELECT id FROM emails WHERE {UNTAGGED}")
+        return connection
+
+    def import_csv(self, csv_path) -> int:
+        """
+        One-time import of a legacy emails.csv file, keeping the original ids.
+        Returns the number of imported rows.
+        """
+        if csv_path is None or not os.path.exists(csv_path):
+            return 0
+        key = os.path.abspath(csv_path)
+
+        def insert(connection):
+            if connection.execute("SELECT 1 FROM imports WHERE path = ?", (key,)).fetchone():
+                return 0
+            emails_df = pd.read_csv(csv_path, index_col='id', dtype=str, keep_default_na=False)
+            rows = [(int(email_id), *(row.get(field, '') for field in EMAIL_FIELDS))
+                for email_id, row in zip(emails_df.index, emails_df.to_dict(orient='records'))]
+            connection.executemany(
+                "INSERT OR IGNORE INTO emails (id, date, from_email, to_email, tags, subject, body) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.execute(f"INSERT OR IGNORE INTO pending (email_id) SELECT id FROM emails WHERE {UNTAGGED}")
+            connection.execute("INSERT INTO imports (path, rows) VALUES (?, ?)", (key, len(rows)))
+            return len(rows)
+
+        return self._write(insert)
+
+    def append(self, email: dict, priority: int = 0) -> int:
+        """
+        Append an email, queue it as pending and return its new id.
+        """
+        values = [email.get(field, '') for field in EMAIL_FIELDS]
+
+        def insert(connection):
+            email_id = connection.execute(
+                "INSERT INTO emails (date, from_email, to_email, tags, subject, body) VALUES (?, ?, ?, ?, ?, ?)", values).lastrowid
+            if ',' not in (email.get('tags') or ''):
+                connection.execute("INSERT INTO pending (email_id, priority) VALUES (?, ?)", (email_id, priority))
+            return email_id
+
+        return self._write(insert)
+
+    def _write(self, operation):
+        """
+        Run operation(connection) inside a write transaction and return its result.
+
+        The request is queued; the thread that gets the connection runs every
+        queued request in one transaction (group commit), each one inside its
+        own savepoint so a failing request does not undo the others.
+        """
+        request = {'operation': operation, 'done': threading.Event(), 'result': None, 'error': None}
+        with self._queue_lock:
+            self._queue.append(request)
+        with self._lock:
+            if not request['done'].is_set():
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                self._commit(batch)
+        if request['error'] is not None:
+            raise request['error']
+        return request['result']
+
+    def _commit(self, batch):
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                self.connection.execute("SAVEPOINT request")
+                try:
+                    request['result'] = request['operation'](self.connection)
+                    self.connection.execute("RELEASE request")
+                except Exception as e:
+                    self.connection.execute("ROLLBACK TO request")
+                    self.connection.execute("RELEASE request")
+                    request['error'] = e
+            self.connection.execute("COMMIT")
+        except Exception as e:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
+            for request in batch:
+                request['result'], request['error'] = None, e
+        finally:
+            for request in batch:
+                request['done'].set()
+
+    def get(self, email_id: int) -> Optional[dict]:
+        """
+        Return the email with the given id or None.
+        """
+        with self._lock:
+            row = self.connection.execute("SELECT * FROM emails WHERE id = ?", (int(email_id),)).fetchone()
+        return self._to_dict(row)
+
+    def next_pending(self) -> Optional[dict]:
+        """
+        Return the next email to tag (highest priority, oldest first) or None.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT emails.* FROM pending JOIN emails ON emails.id = pending.email_id "
+                "ORDER BY pending.priority DESC, pending.email_id LIMIT 1").fetchone()
+        return self._to_dict(row)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT count(*) FROM pending").fetchone()[0]
+
+    def add_tag(self, email_id: int, tag_string: str) -> str:
+        """
+        Add a tag to an email and return the resulting tags string.
+        Raises KeyError if the email does not exist.
+        """
+        return self._write(lambda connection: self._add_tag(connection, email_id, tag_string))
+
+    def add_tags(self, email_tags) -> list:
+        """
+        Add many (email_id, tag) pairs in a single transaction.
+        Returns, for each pair, the resulting tags string or the exception raised.
+        """
+        def update(connection):
+            results = []
+            for email_id, tag_string in email_tags:
+                try:
+                    results.append(self._add_tag(connection, email_id, tag_string))
+                except (KeyError, ValueError, TypeError) as e:
+                    results.append(e)
+            return results
+
+        return self._write(update)
+
+    @staticmethod
+    def _add_tag(connection, email_id, tag_string) -> str:
+        row = connection.execute("SELECT tags FROM emails WHERE id = ?", (int(email_id),)).fetchone()
+        if row is None:
+            raise KeyError(email_id)
+        tags = merge_tags(row['tags'], tag_string)
+        connection.execute("UPDATE emails SET tags = ? WHERE id = ?", (tags, int(email_id)))
+        if ',' in tags:
+            connection.execute("DELETE FROM pending WHERE email_id = ?", (int(email_id),))
+        return tags
+
+    def count(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT count(*) FROM emails").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _to_dict(row) -> Optional[dict]:
+        if row is None:
+            return None
+        return {key: ('' if row[key] is None else row[key]) for key in row.keys()}
+
+
+def merge_tags(tags, tag_string) -> str:
+    """
+    Add tag_string to a comma separated tags string, without duplicates.
+    """
+    tags = tags.split(',') if tags else []
+    if tag_string not in tags:
+        tags.append(tag_string)
+    return ','.join(tags)
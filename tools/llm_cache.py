@@ -0,0 +1,119 @@
+"""Persistent cache of LLM responses keyed by model, options, system prompt and input."""
+
+from typing import Any, Callable, Optional
+import hashlib
+import json
+import os
+
+try:
+    from tools.web_cache import WebCache, WEB_CACHE_PATH
+    from tools.single_flight import SingleFlight
+except ImportError:
+    from web_cache import WebCache, WEB_CACHE_PATH
+    from single_flight import SingleFlight
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', WEB_CACHE_PATH)
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', 24 * 365))
+# ChatOllama fields that change the generated text
+OPTION_FIELDS = ['mirostat', 'mirostat_eta', 'mirostat_tau', 'num_ctx', 'num_predict', 'repeat_last_n',
+    'repeat_penalty', 'temperature', 'seed', 'stop', 'tfs_z', 'top_k', 'top_p', 'format', 'reasoning']
+
+
+def llm_cache_key(model: str, options: dict, system_prompt: str, text: Any) -> str:
+    """
+    Key of a generation: the model, its options, the system prompt and a hash of the input.
+    """
+    input_hash = hashlib.sha256(json.dumps(text, sort_keys=True, default=str).encode()).hexdigest()
+    return json.dumps([model, options, system_prompt, input_hash], sort_keys=True, default=str)
+
+
+def llm_settings(llm) -> tuple[str, dict]:
+    """
+    Return (model, options) of a chat model, including the arguments bound with
+    bind / bind_tools (tools, format...).
+    """
+    bound = {}
+    while hasattr(llm, 'bound'):
+        bound = {**llm.kwargs, **bound}
+        llm = llm.bound
+    options = {field: getattr(llm, field) for field in OPTION_FIELDS if getattr(llm, field, None) is not None}
+    options.update(bound)
+    return llm.model, options
+
+
+def split_messages(messages) -> tuple[str, list]:
+    """
+    Return the system prompt and the (role, content, tool calls) of the other messages.
+    """
+    system_prompt = '\n'.join(str(m.content) for m in messages if m.type == 'system')
+    return system_prompt, [(m.type, m.content, getattr(m, 'tool_calls', None) or None)
+        for m in messages if m.type != 'system']
+
+
+class LLMCache:
+    """
+    Memoizes LLM calls in a WebCache namespace, so identical requests (same model,
+    options, system prompt and input) are answered without generating again, across
+    processes and reruns. Concurrent identical requests share a single generation.
+    """
+
+    def __init__(self, cache: Optional[WebCache] = None):
+        self.cache = cache if cache is not None else WebCache(db_path=LLM_CACHE_PATH, namespace='llm',
+            ttl_hours=LLM_CACHE_TTL_HOURS)
+        self.flights = SingleFlight()
+
+    def memoize(self, model: str, options: dict, system_prompt: str, text: Any, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Return the cached result of the generation or call fn(*args, **kwargs) and store it.
+        """
+        key = llm_cache_key(model, options, system_prompt, text)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        def generate():
+            result = fn(*args, **kwargs)
+            self.cache.set(key, result)
+            return result
+
+        return self.flights.do(key, generate)
+
+    async def amemoize(self, model: str, options: dict, system_prompt: str, text: Any, fn: Callable, *args, **kwargs) -> Any:
+        key = llm_cache_key(model, options, system_prompt, text)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        async def generate():
+            result = await fn(*args, **kwargs)
+            self.cache.set(key, result)
+            return result
+
+        return await self.flights.ado(key, generate)
+
+    def _request(self, llm, messages, schema, kwargs):
+        model, options = llm_settings(llm)
+        if schema is not None:
+            options['schema'] = schema.model_json_schema() if hasattr(schema, 'model_json_schema') else schema
+            llm = llm.with_structured_output(schema)
+        system_prompt, text = split_messages(messages)
+        return llm, model, {**options, **kwargs}, system_prompt, text
+
+    def invoke(self, llm, messages, schema = None, config = None, **kwargs):
+        """
+        Cached llm.invoke(messages, config, **kwargs) for chat models, or of
+        llm.with_structured_output(schema) when a schema is given. The config
+        (callbacks, tags...) is not part of the key.
+        """
+        runnable, model, options, system_prompt, text = self._request(llm, messages, schema, kwargs)
+        return self.memoize(model, options, system_prompt, text, runnable.invoke, messages, config, **kwargs)
+
+    async def ainvoke(self, llm, messages, schema = None, config = None, **kwargs):
+        runnable, model, options, system_prompt, text = self._request(llm, messages, schema, kwargs)
+        return await self.amemoize(model, options, system_prompt, text, runnable.ainvoke, messages, config, **kwargs)
+
+    def clear(self):
+        self.cache.clear()
+
+
+llm_cache = LLMCache()
@@ -1,25 +1,110 @@
-from mcp.server.fastmcp import FastMCP
-from langchain_core.tools import tool
-from langchain_mcp_adapters.tools import to_fastmcp
-import web_operations
-import file_operations
-import bash_operations
+import argparse
 import datetime
+import importlib
+import json
+import os
+from typing import Any
+from pydantic import create_model
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.tools.base import Tool
+from mcp.server.fastmcp.utilities.func_metadata import ArgModelBase, FuncMetadata
+from mcp.server.transport_security import TransportSecuritySettings
+from mcp_daemon import runtime_dir, source_fingerprint
+
+# modules whose langchain tools are served; add "web_operations" to expose the web tools
+TOOL_MODULES = ["file_operations", "bash_operations"]
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp-manifest.json")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
 
-@tool()
 def get_current_time():
     """Returns current system time."""
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-tools=[
-    to_fastmcp(get_current_time),
-    ]
 
-for module in [file_operations, bash_operations]:
-    for func in dir(module):
-        # check if func is a tool method of the module
-        if (type(getattr(module, func)).__name__ == 'StructuredTool'):
-            tools.append(to_fastmcp(getattr(module, func)))
+def build_manifest(modules = TOOL_MODULES) -> list[dict]:
+    """
+    Imports the tool modules and returns the declaration of every StructuredTool
+    they define: {module, name, description, parameters}.
+    """
+    manifest = []
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+        for func in dir(module):
+            # check if func is a tool method of the module
+            if (type(getattr(module, func)).__name__ == 'StructuredTool'):
+                tool = getattr(module, func)
+                manifest.append({'module': module_name, 'name': tool.name, 'description': tool.description,
+                    'parameters': tool.tool_call_schema.model_json_schema()})
+    return manifest
+
+
+def write_manifest(file_path = MANIFEST_PATH, modules = TOOL_MODULES):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(build_manifest(modules), f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def load_manifest(file_path = MANIFEST_PATH, modules = TOOL_MODULES) -> list[dict]:
+    """
+    Reads the tool declarations, rebuilding the manifest when it is missing.
+    """
+    if not os.path.exists(file_path):
+        write_manifest(file_path, modules)
+    with open(file_path, encoding='utf-8') as f:
+        return [entry for entry in json.load(f) if entry['module'] in modules]
+
+
+def lazy_tool(entry: dict) -> Tool:
+    """
+    FastMCP tool advertised from its manifest entry. The module that implements
+    it is imported on the first call; the langchain tool validates the arguments.
+    """
+    parameters = entry['parameters']
+    required = set(parameters.get('required', []))
+    arg_model = create_model(f"{entry['name']}Arguments", __base__=ArgModelBase, **{
+        field: (Any, ... if field in required else schema.get('default'))
+        for field, schema in parameters.get('properties', {}).items()})
+    loaded = {}
+
+    async def fn(**arguments: Any) -> Any:
+        if 'tool' not in loaded:
+            loaded['tool'] = getattr(importlib.import_module(entry['module']), entry['name'])
+        return await loaded['tool'].ainvoke(arguments)
+
+    return Tool(fn=fn, name=entry['name'], description=entry['description'], parameters=parameters,
+        fn_metadata=FuncMetadata(arg_model=arg_model), is_async=True)
+
+
+def create_server(**settings) -> FastMCP:
+    tools = [Tool.from_function(get_current_time)] + [lazy_tool(entry) for entry in load_manifest()]
+    server = FastMCP("mcp", tools=tools, **settings)
+    # reported as serverInfo.version in the initialize answer, so mcp_daemon
+    # can tell when the running server no longer matches the code on disk
+    server._mcp_server.version = source_fingerprint(__file__)
+    return server
+
+
+def serve_unix_socket(server: FastMCP, socket_path):
+    """
+    Serve the streamable HTTP app on a unix socket readable and writable only
+    by the current user (mode 0600, in a 0700 directory).
+    """
+    import socket
+    import uvicorn
+
+    runtime_dir(socket_path)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # bound here because uvicorn makes the sockets it creates world-writable
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous = os.umask(0o177)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(previous)
+    config = uvicorn.Config(server.streamable_http_app(), fd=listener.fileno(), log_level=server.settings.log_level.lower())
+    uvicorn.Server(config).run()
 
 
 if __name__ == "__main__":
@@ -31,7 +116,24 @@ if __name__ == "__main__":
     # print(bash_operations.check_port_open.invoke(input={'destination':'localhost', 'port':'8080'}))
     # print(web_operations.ollama_model.invoke(input=''))
     # print(web_operations.ollama_model_details.invoke(input={'model_name':'qwen3:14b'}))
-    FastMCP("mcp", tools=tools).run(transport="stdio")
-
+    parser = argparse.ArgumentParser(description="MCP server with the project tools")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP host, loopback only (streamable-http only)")
+    parser.add_argument("--port", type=int, default=8765, help="HTTP port (streamable-http only)")
+    parser.add_argument("--socket", help="Serve streamable-http on this unix socket instead of a TCP port")
+    parser.add_argument("--write-manifest", action="store_true", help=f"Regenerate {os.path.basename(MANIFEST_PATH)} from the tool modules and exit")
+    args = parser.parse_args()
 
-    
+    if args.write_manifest:
+        write_manifest()
+    elif args.transport == "streamable-http" and args.socket:
+        # the Host header over the socket is "localhost", without a port
+        security = TransportSecuritySettings(enable_dns_rebinding_protection=True,
+            allowed_hosts=["localhost", "localhost:*", "127.0.0.1:*", "[::1]:*"],
+            allowed_origins=["http://localhost", "http://localhost:*", "http://127.0.0.1:*", "http://[::1]:*"])
+        serve_unix_socket(create_server(log_level="WARNING", transport_security=security), args.socket)
+    else:
+        # the tools run shell commands: never listen on an address other hosts can reach
+        if args.transport == "streamable-http" and args.host not in LOOPBACK_HOSTS:
+            parser.error(f"--host must be a loopback address ({', '.join(LOOPBACK_HOSTS)}), use --socket for a private server")
+        create_server(host=args.host, port=args.port, log_level="WARNING").run(transport=args.transport)
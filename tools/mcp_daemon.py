@@ -0,0 +1,231 @@
+"""Long-lived MCP server shared by the CLIs over streamable HTTP on a private unix socket."""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+try:
+    from tools.atomic_file import locked_file
+except ImportError:
+    from atomic_file import locked_file
+
+MCP_SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp-srv.py")
+# per-user directory (mode 0700) holding the socket, the pid file and the log
+MCP_RUNTIME_DIR = os.getenv('MCP_RUNTIME_DIR') or os.path.join(
+    os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir(), f"mcp-srv-{os.getuid()}")
+MCP_SOCKET = os.getenv('MCP_SOCKET') or os.path.join(MCP_RUNTIME_DIR, "mcp.sock")
+MCP_PATH = '/mcp'
+# Host header sent over the socket; accepted by the server's DNS rebinding check
+MCP_URL = f"http://localhost{MCP_PATH}"
+PROTOCOL_VERSION = "2025-03-26"
+
+
+def runtime_dir(socket_path = MCP_SOCKET) -> str:
+    """
+    Create the directory of the socket, or check that only the current user can
+    use it: anyone able to connect to the socket can run the shell tools.
+    """
+    directory = os.path.dirname(socket_path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"{directory} must be owned by the current user with mode 0700")
+    return directory
+
+
+def source_fingerprint(script = MCP_SERVER_SCRIPT) -> str:
+    """
+    Hash of the server script path and of the modification times of the script,
+    the tool modules and the manifest next to it. A running server with another
+    fingerprint serves stale code and is restarted.
+    """
+    script = os.path.abspath(script)
+    directory = os.path.dirname(script)
+    files = sorted({script} | set(glob.glob(os.path.join(directory, "*.py")))
+        | set(glob.glob(os.path.join(directory, "*.json"))))
+    digest = hashlib.sha256(script.encode())
+    for file_path in files:
+        info = os.stat(file_path)
+        digest.update(f"\0{os.path.basename(file_path)}:{info.st_mtime_ns}:{info.st_size}".encode())
+    return digest.hexdigest()[:16]
+
+
+def connection(socket_path = MCP_SOCKET) -> dict:
+    """
+    Connection settings of the daemon for MultiServerMCPClient.
+    """
+    def client_factory(headers = None, timeout = None, auth = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=socket_path), headers=headers,
+            timeout=timeout, auth=auth, follow_redirects=True)
+
+    return {"url": MCP_URL, "transport": "streamable_http", "httpx_client_factory": client_factory}
+
+
+def _rpc_result(response: httpx.Response) -> dict:
+    # the answer comes as plain JSON or as a server-sent event, depending on the server settings
+    if response.headers.get('content-type', '').startswith('text/event-stream'):
+        data = [line[5:].strip() for line in response.text.splitlines() if line.startswith('data:')]
+        message = json.loads(data[-1])
+    else:
+        message = response.json()
+    if 'error' in message:
+        raise RuntimeError(f"MCP error: {message['error']}")
+    return message['result']
+
+
+def server_info(socket_path = MCP_SOCKET, timeout = 2.0) -> dict | None:
+    """
+    Readiness handshake: run an MCP initialize on the socket and return the
+    serverInfo of the answer ({name, version}), or None when no MCP server answers.
+    """
+    if not os.path.exists(socket_path):
+        return None
+    request = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+        "protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+        "clientInfo": {"name": "mcp_daemon", "version": "1"}}}
+    headers = {"Accept": "application/json, text/event-stream"}
+    try:
+        with httpx.Client(transport=httpx.HTTPTransport(uds=socket_path), timeout=timeout) as client:
+            response = client.post(MCP_URL, json=request, headers=headers)
+            response.raise_for_status()
+            info = _rpc_result(response).get('serverInfo', {})
+            session = response.headers.get('mcp-session-id')
+            if session:
+                client.delete(MCP_URL, headers={"mcp-session-id": session})
+            return info
+    except (httpx.HTTPError, OSError, ValueError, KeyError, IndexError, RuntimeError):
+        return None
+
+
+def is_ready(socket_path = MCP_SOCKET, timeout = 2.0) -> bool:
+    return server_info(socket_path, timeout) is not None
+
+
+def _pid_path(socket_path) -> str:
+    return socket_path + ".pid"
+
+
+def _signal(pid: int, signum: int) -> bool:
+    try:
+        # reap the server if this process spawned it, so it does not linger as a zombie
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, signum)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def _is_server(pid: int, socket_path) -> bool:
+    """
+    Whether the process is the server spawned for the socket. After a crash the
+    pid in the pid file may belong to another process, which must not be killed.
+    """
+    try:
+        with open(f"/proc/{pid}/cmdline", 'rb') as f:
+            arguments = f.read().decode(errors='replace').split('\0')
+    except OSError:
+        return False
+    return any(argument == "--socket" and value == socket_path for argument, value in zip(arguments, arguments[1:]))
+
+
+def stop_server(socket_path = MCP_SOCKET, timeout = 10.0) -> bool:
+    """
+    Stop the daemon listening on the socket. Returns False when none was running;
+    the stale socket and pid files are removed either way.
+    """
+    try:
+        with open(_pid_path(socket_path)) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        pid = None
+    stopped = pid is not None and _is_server(pid, socket_path) and _signal(pid, signal.SIGTERM)
+    if stopped:
+        deadline = time.monotonic() + timeout
+        while _signal(pid, 0):
+            if time.monotonic() > deadline:
+                _signal(pid, signal.SIGKILL)
+                break
+            time.sleep(0.05)
+    for file_path in (socket_path, _pid_path(socket_path)):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+    return stopped
+
+
+def ensure_server(script = MCP_SERVER_SCRIPT, socket_path = MCP_SOCKET, timeout = 60.0) -> dict:
+    """
+    Return the connection of the running daemon, spawning it on first use.
+
+    The spawned server is detached from the caller, so later CLI invocations
+    reuse it and skip the interpreter start-up and the tool imports. A daemon
+    started from another script, or before the tools changed, is restarted.
+    """
+    fingerprint = source_fingerprint(script)
+    info = server_info(socket_path)
+    if info is not None and info.get('version') == fingerprint:
+        return connection(socket_path)
+
+    directory = runtime_dir(socket_path)
+    log_path = socket_path + ".log"
+    with locked_file(os.path.join(directory, "spawn")):
+        # another CLI may have (re)started it while we waited for the lock
+        info = server_info(socket_path)
+        if info is not None and info.get('version') == fingerprint:
+            return connection(socket_path)
+        stop_server(socket_path)
+
+        with open(log_path, 'ab') as log:
+            process = subprocess.Popen(
+                [sys.executable, script, "--transport", "streamable-http", "--socket", socket_path],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+        with open(_pid_path(socket_path), 'w') as f:
+            f.write(str(process.pid))
+
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while not is_ready(socket_path):
+            if process.poll() is not None:
+                raise RuntimeError(f"MCP server failed to start, see {log_path}")
+            if time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"MCP server not ready after {timeout} seconds, see {log_path}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    return connection(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the persistent MCP server of the CLIs")
+    parser.add_argument("command", choices=["start", "stop", "restart", "status"])
+    parser.add_argument("--mcp-server", default=MCP_SERVER_SCRIPT, help="Path to MCP server script")
+    parser.add_argument("--socket", default=MCP_SOCKET, help="Unix socket of the server")
+    args = parser.parse_args()
+
+    if args.command in ("stop", "restart"):
+        print("stopped" if stop_server(args.socket) else "not running")
+    if args.command in ("start", "restart"):
+        ensure_server(args.mcp_server, args.socket)
+        print(f"running on {args.socket}")
+    if args.command == "status":
+        info = server_info(args.socket)
+        if info is None:
+            print("not running")
+        else:
+            current = info.get('version') == source_fingerprint(args.mcp_server)
+            print(f"running on {args.socket} ({'up to date' if current else 'stale, restart it'})")
@@ -0,0 +1,165 @@
+"""Keeps the Ollama models of a pipeline loaded and orders its stages to avoid model swaps."""
+
+from typing import Callable, Optional
+import time
+
+try:
+    from tools.ollama_operations import OllamaClient, ollama_client
+except ImportError:
+    from ollama_operations import OllamaClient, ollama_client
+
+# time an idle model stays in memory after its last request
+DEFAULT_KEEP_ALIVE = "30m"
+# seconds allowed for loading a model from disk
+LOAD_TIMEOUT = 600
+
+
+def model_name(model: str) -> str:
+    return model if ':' in model else f"{model}:latest"
+
+
+def plan_stages(stages: list[dict], loaded = ()) -> list[dict]:
+    """
+    Order the stages ({'name', 'model', 'after': [stage names]}) so that their
+    dependencies run first and consecutive stages share the model when possible:
+    among the stages that are ready, the ones using the current model go first,
+    then the ones of an already loaded model, then the ones of the model that the
+    most ready stages need.
+    """
+    loaded = {model_name(model) for model in loaded}
+    current = None
+    by_name = {stage['name']: stage for stage in stages}
+    for stage in stages:
+        for name in stage.get('after', []):
+            if name not in by_name:
+                raise ValueError(f"Stage {stage['name']} depends on unknown stage {name}")
+    done = set()
+    order = []
+    pending = list(stages)
+    while pending:
+        ready = [stage for stage in pending if all(name in done for name in stage.get('after', []))]
+        if not ready:
+            raise ValueError(f"Stages with circular dependencies: {[stage['name'] for stage in pending]}")
+        same = [stage for stage in ready if model_name(stage['model']) == current]
+        if not same:
+            counts = {}
+            for stage in ready:
+                counts[model_name(stage['model'])] = counts.get(model_name(stage['model']), 0) + 1
+            current = max(counts, key=lambda model: (model in loaded, counts[model]))
+            same = [stage for stage in ready if model_name(stage['model']) == current]
+        stage = same[0]
+        order.append(stage)
+        done.add(stage['name'])
+        pending.remove(stage)
+    return order
+
+
+def count_swaps(stages: list[dict], current: Optional[str] = None) -> int:
+    swaps = 0
+    for stage in stages:
+        if model_name(stage['model']) != current:
+            swaps += 1
+            current = model_name(stage['model'])
+    return swaps
+
+
+class ModelResidencyManager:
+    """
+    Loads models ahead of the stages that need them and tracks what the Ollama
+    server keeps in memory (/api/ps).
+
+    Models are loaded with an empty generate request and an explicit keep_alive,
+    so they stay resident between stages instead of expiring after the server
+    default of five minutes; every request resets it, so the chat models of the
+    stages should use the same value (ChatOllama(keep_alive=manager.keep_alive)). When a memory budget is set, resident models that no
+    remaining stage needs are unloaded before loading a model that would not fit;
+    models still needed are never unloaded, so the model is then loaded over the
+    budget (the server may evict on its own). Every load is recorded in `loads`
+    with its wall time and the size the server reports once it is resident.
+    """
+
+    def __init__(self, client: OllamaClient = ollama_client, keep_alive = DEFAULT_KEEP_ALIVE,
+        memory_budget: Optional[int] = None):
+        self.client = client
+        self.keep_alive = keep_alive
+        self.memory_budget = memory_budget
+        self.loads = []
+
+    def resident(self) -> dict:
+        """
+        Return {model: {'size', 'size_vram', 'expires_at'}} of the loaded models.
+        """
+        return {model['name']: {'size': model.get('size', 0), 'size_vram': model.get('size_vram', 0),
+            'expires_at': model.get('expires_at')} for model in self.client.ps(max_age=0).get('models', [])}
+
+    def memory_usage(self) -> dict:
+        resident = self.resident()
+        return {'size': sum(model['size'] for model in resident.values()),
+            'size_vram': sum(model['size_vram'] for model in resident.values()), 'models': len(resident)}
+
+    def model_size(self, model: str) -> int:
+        for entry in self.client.tags().get('models', []):
+            if model_name(entry.get('name', '')) == model_name(model):
+                return entry.get('size', 0)
+        return 0
+
+    def load(self, model: str, keep_alive = None) -> dict:
+        """
+        Load the model (or refresh its keep_alive) and record the load time.
+        """
+        # an empty generate request answers {model, created_at, done, done_reason: "load"}
+        # once the model is in memory, without timings: the load is measured by wall time
+        start = time.perf_counter()
+        self.client.post('/api/generate', {'model': model, 'keep_alive': keep_alive or self.keep_alive},
+            timeout=LOAD_TIMEOUT)
+        seconds = time.perf_counter() - start
+        resident = self.resident().get(model_name(model))
+        record = {'model': model_name(model), 'seconds': seconds, 'size': resident['size'] if resident else 0}
+        self.loads.append(record)
+        return record
+
+    def unload(self, model: str):
+        self.client.post('/api/generate', {'model': model, 'keep_alive': 0})
+
+    def ensure(self, model: str, needed: tuple = ()) -> Optional[dict]:
+        """
+        Make the model resident, first unloading the resident models not in
+        needed if a budget is set and the model would not fit. Returns the load
+        record, or None when the model was already loaded.
+        """
+        resident = self.resident()
+        if model_name(model) in resident:
+            return None
+        if self.memory_budget is not None:
+            used = sum(entry['size'] for entry in resident.values())
+            required = self.model_size(model)
+            keep = {model_name(name) for name in needed}
+            for name in resident:
+                if used + required <= self.memory_budget:
+                    break
+                if name not in keep:
+                    self.unload(name)
+                    used -= resident[name]['size']
+            if used + required > self.memory_budget:
+                print(f"Loading {model_name(model)} over the memory budget: the resident models are still needed")
+        return self.load(model)
+
+    def preload(self, models: list[str]) -> list[dict]:
+        """
+        Load the models a pipeline declares, in order. Returns the new load records.
+        """
+        records = [self.ensure(model, needed=models) for model in dict.fromkeys(models)]
+        return [record for record in records if record is not None]
+
+    def run(self, stages: list[dict], inputs: Optional[dict] = None) -> dict:
+        """
+        Run the stages in the planned order. Each stage has a 'run' callable that
+        receives the results of the previous stages ({stage name: result}).
+        """
+        results = dict(inputs or {})
+        order = plan_stages(stages, loaded=self.resident())
+        for index, stage in enumerate(order):
+            self.ensure(stage['model'], needed=tuple(later['model'] for later in order[index:]))
+            run: Callable = stage['run']
+            results[stage['name']] = run(results)
+        return results
@@ -1,14 +1,29 @@
 import os
 import re
-from odf import opendocument, teletype
+import zipfile
+from xml.sax import handler
+from defusedxml.sax import make_parser
+from odf import opendocument
+from odf.element import Node
+from odf.namespaces import DRAWNS, OFFICENS, TEXTNS, XLINKNS
 from odf.text import P, Span
 from odf.style import Style, TextProperties
 
+# elements that stand for whitespace in the text
+WHITESPACE = {(TEXTNS, 'line-break'): "\n", (TEXTNS, 'tab'): "\t", (TEXTNS, 's'): " "}
+
 class OdtDocument:
 
     def __init__(self, file_path):
         self.file_path = file_path
         self.document = self.load(file_path)
+        # flat index of the body, built on first use: nodes in document order
+        # (the position is the index used by the indexed methods), the position
+        # of every node and the extracted text of the elements already read
+        self._elements = None
+        self._positions = None
+        self._texts = {}
+        self._has_bold_style = False
     
     def load(self, file_path):
         """
@@ -34,24 +49,112 @@ class OdtDocument:
         self.document.save(file_path)
         print(f"Document saved to {file_path}")
 
-    def _traverse(self, index, node, callback) -> int:
+    def iter_nodes(self, node = None, prune = ()):
+        """
+        Iterates the subtree of node (the body by default) in document order
+        without recursion, yielding (index, node). The index is the position in
+        the walk of the whole subtree, so walking the body yields the indices
+        used by the indexed methods.
+
+        The walk is lazy, so the caller can stop it at any point. The children
+        of the nodes whose tag is in prune (e.g. {'text:p', 'table:table'}) are
+        not visited. In the body, the indices after a pruned node are read from
+        the flat index when it is already built; otherwise they are None, since
+        counting the skipped nodes would visit them: use index_of(node) for the
+        nodes to edit.
         """
-        Iterates between the tree and calls the callback function on every node
+        root = self.document.body if node is None else node
+        in_body = False
+        ancestor = root
+        while ancestor is not None and not in_body:
+            in_body = ancestor is self.document.body
+            ancestor = ancestor.parentNode
+        current = root
+        index = 0
+        while current is not None:
+            if prune and in_body and self._elements is not None:
+                positions = self._position_map()
+                index = positions[current] - positions[root]
+            yield index, current
+            if index is not None:
+                index += 1
+            if current.firstChild is not None:
+                if current.tagName not in prune:
+                    current = current.firstChild
+                    continue
+                if not in_body:
+                    # outside the body: count the skipped nodes to keep the indices
+                    index += len(self._subtree(current)) - 1
+                elif self._elements is None:
+                    index = None
+            # next sibling of the node or of its closest ancestor inside the subtree
+            while current is not root and current.nextSibling is None:
+                current = current.parentNode
+            current = None if current is root else current.nextSibling
+
+    def _subtree(self, node) -> list:
         """
-        if node is None:
-            return -1
-            
-        # call the callback function passing the node
-        if callback(index=index, node=node) == -1:
-            return -1
+        Nodes of the subtree of node in document order.
+        """
+        return [node for _, node in self.iter_nodes(node)]
+
+    def _index(self) -> list:
+        if self._elements is None:
+            self._elements = self._subtree(self.document.body)
+            self._positions = None
+        return self._elements
+
+    def _position_map(self) -> dict:
+        if self._positions is None:
+            self._positions = {node: index for index, node in enumerate(self._index())}
+        return self._positions
 
-        # Traverse children first (depth-first)
-        current_child = node.firstChild
-        while current_child is not None:
-            index = self._traverse(index=index+1, node=current_child, callback=callback)
-            if index == -1: break
-            current_child = current_child.nextSibling
-        return index
+    def index_of(self, node) -> int:
+        """
+        Index of a node of the body, as used by the indexed methods.
+        """
+        return self._position_map()[node]
+
+    def _node_text(self, node) -> str:
+        """
+        Text of the node with the whitespace elements evaluated, the same as
+        teletype.extractText. The text of every element read is cached, so
+        nested elements are only read once.
+        """
+        texts = self._texts
+        if node in texts:
+            return texts[node]
+        stack = [(node, False)]
+        while stack:
+            current, ready = stack.pop()
+            if current in texts:
+                continue
+            if not ready:
+                stack.append((current, True))
+                stack.extend((child, False) for child in current.childNodes
+                    if child.nodeType == Node.ELEMENT_NODE and child.qname not in WHITESPACE and child not in texts)
+                continue
+            parts = []
+            for child in current.childNodes:
+                if child.nodeType == Node.TEXT_NODE:
+                    parts.append(child.data)
+                elif child.nodeType == Node.ELEMENT_NODE:
+                    if child.qname == (TEXTNS, 's'):
+                        parts.append(" " * int(child.getAttribute('c') or 1))
+                    elif child.qname in WHITESPACE:
+                        parts.append(WHITESPACE[child.qname])
+                    else:
+                        parts.append(texts[child])
+            texts[current] = ''.join(parts)
+        return texts[node]
+
+    def _invalidate(self, node):
+        """
+        Drop the cached text of a changed node and of its ancestors.
+        """
+        while node is not None:
+            self._texts.pop(node, None)
+            node = node.parentNode
 
     def get_indexed_elements(self) -> dict[int: opendocument.Element]:
         """
@@ -61,16 +164,7 @@ class OdtDocument:
         Returns:
             dict: Dictionary with index as key and node as value
         """
-        result = {}
-        
-        def index_nodes(index, node) -> int:
-            nonlocal result
-            result[index] = node
-            return index
-
-        self._traverse(0, self.document.body, index_nodes)
-
-        return result
+        return dict(enumerate(self._index()))
 
     def get_indexed_text(self, markdown = True)-> dict[int:str]:
         """
@@ -78,49 +172,101 @@ class OdtDocument:
         """
         content_dict = {}
 
-        def get_text(index, node) -> int:
-
-            nonlocal content_dict
-            nonlocal markdown
-
-            text = teletype.extractText(node)
+        for index, node in enumerate(self._index()):
             try:
                 if node.tagName  == 'text:a':
+                    text = self._node_text(node)
                     link = node.attributes.get(('http://www.w3.org/1999/xlink', 'href'), 'unkown')
                     # If is a A then assume parent is a P and it's index is on -1
                     content_dict[index-1] = f"[{text}]({link})" if markdown and text  else text
                 elif node.tagName == 'draw:line':
                     content_dict[index-1] = "---" if markdown else ''
                 elif node.tagName  == 'text:p':
+                    text = self._node_text(node)
                     if node.parentNode.tagName  == 'text:list-item':
                         content_dict[index] = f"- {text}" 
                     else:
                         content_dict[index] = f"{text}" if markdown and text else text
                 elif node.tagName  ==  'text:h':
+                    text = self._node_text(node)
                     level = int(node.attributes.get(('urn:oasis:names:tc:opendocument:xmlns:text:1.0', 'outline-level'), '4'))
                     content_dict[index] = f"{'#'*level} {text}" if markdown and text else text
             except Exception as ex:
                 print(f"{ex} processing element {index}")
 
-            return index
-
-        self._traverse(0, self.document.body, get_text)
-
         return content_dict
 
     def get_text(self, markdown = True) -> str:
         return "\n".join(self.get_indexed_text(markdown = markdown).values())
 
-    def replace(self, indexed_replacements: dict[int: str]):
+    def replace(self, indexed_replacements: dict[int: str]) -> dict[int: str]:
+        """
+        Replace the elements at the given indices by paragraphs with the new text
+        (markdown **bold** supported), in one pass over the index.
 
-        for index, element in reversed(list(self.get_indexed_elements().items())):
-            try:
-                if index in indexed_replacements:
-                    self._set_text(element, indexed_replacements[index])
-                    # print(f"Updated {index}: {indexed_replacements[index]}")
+        Returns the result of every index: "replaced", "not found", "inside
+        replaced element <index>" when an ancestor is replaced too (its new text
+        wins) or the error raised.
+        """
+        elements = self._index()
+        report = {}
+        targets = []
+        for index in indexed_replacements:
+            if isinstance(index, int) and 0 <= index < len(elements):
+                targets.append(index)
+            else:
+                report[index] = "not found"
 
+        updated = []
+        position = 0
+        replaced = None
+        stale = False
+        for index in sorted(targets):
+            if index < position:
+                report[index] = f"inside replaced element {replaced}"
+                continue
+            old_nodes = self._subtree(elements[index])
+            try:
+                new_elem = self._set_text(elements[index], indexed_replacements[index])
             except Exception as e:
                 print(f"Error {e} processing element {index}")
+                report[index] = f"Error {e}"
+                # the element may have been changed before the error
+                self._invalidate(elements[index])
+                stale = True
+                continue
+            for node in old_nodes:
+                self._texts.pop(node, None)
+            self._invalidate(new_elem)
+            updated.extend(elements[position:index])
+            updated.extend(self._subtree(new_elem))
+            position = index + len(old_nodes)
+            replaced = index
+            report[index] = "replaced"
+
+        if stale:
+            self._elements = None
+        elif position:
+            updated.extend(elements[position:])
+            self._elements = updated
+        self._positions = None
+        return {index: report[index] for index in indexed_replacements}
+
+    def _bold_style(self) -> str:
+        """
+        Name of the text style used for **bold** words, created on first use.
+        """
+        if not self._has_bold_style:
+            for style in self.document.styles.getElementsByType(Style):
+                if style.getAttribute("name") == "Bold":
+                    break
+            else:
+                bold_style = Style(name="Bold", family="text")
+                bold_props = TextProperties(fontweight="bold")
+                bold_style.addElement(bold_props)
+                self.document.styles.addElement(bold_style)
+            self._has_bold_style = True
+        return "Bold"
 
     def _get_markdown_bolds_fixed(self, text: str) -> list[str]:
         """
@@ -132,7 +278,7 @@ class OdtDocument:
         words = text.split(' ')
         for i,word in enumerate(words):
             if '**' in word:
-                words[i] = f'**{word.replace('**','')}**' 
+                words[i] = f"**{word.replace('**', '')}**"
         return ' '.join(words).split('**')
 
     def _set_text(self, elem, text):
@@ -147,20 +293,6 @@ class OdtDocument:
         text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
         text = re.sub(r'^-\s+', '', text, flags=re.MULTILINE)
 
-        # Create a style for bold text if it doesn't exist
-        bold_style_exists = False
-        for style in self.document.styles.getElementsByType(Style):
-            if style.getAttribute("name") == "Bold":
-                bold_style_exists = True
-                break
-        
-        # Create bold style if it doesn't exist
-        if not bold_style_exists:
-            bold_style = Style(name="Bold", family="text")
-            bold_props = TextProperties(fontweight="bold")
-            bold_style.addElement(bold_props)
-            self.document.styles.addElement(bold_style)
-        
         new_elem = P(stylename=elem.getAttribute("stylename"))
 
         # Split the text by ** to identify bold sections
@@ -173,11 +305,132 @@ class OdtDocument:
                 new_elem.addElement(Span(text=part))
             else:
                 # Bold text
-                new_elem.addElement(Span(stylename="Bold", text=part))
+                new_elem.addElement(Span(stylename=self._bold_style(), text=part))
 
         elem.parentNode.insertBefore(new_elem,elem)
         elem.parentNode.removeChild(elem)
+        return new_elem
         
+class IndexedTextHandler(handler.ContentHandler):
+    """
+    SAX handler that computes get_indexed_text of a content.xml while it is
+    parsed, without building the document tree.
+
+    Nodes are numbered as odfpy builds them on load: every element of the body
+    in document order, plus one text node for each run of characters between
+    two tags (whitespace included). Only the open elements are kept, with the
+    text read so far of the ones inside a paragraph, heading or link. The entry
+    of an element is reserved when it starts (that is the order of the result)
+    and written when it ends, unless a later node wrote the same index.
+    """
+
+    def __init__(self, markdown = True):
+        super().__init__()
+        self.markdown = markdown
+        self.result = {}
+        self.owners = {}
+        self.stack = []
+        self.data = []
+        self.index = -1
+        self.parse = False
+
+    def _flush(self):
+        # a run of characters is a text node of the innermost open element
+        content = ''.join(self.data)
+        self.data = []
+        if content and self.stack:
+            self.index += 1
+            if self.stack[-1]['parts'] is not None:
+                self.stack[-1]['parts'].append(content)
+
+    def characters(self, content):
+        if self.parse:
+            self.data.append(content)
+
+    def startElementNS(self, name, qname, attrs):
+        if name == (OFFICENS, 'body'):
+            self.parse = True
+        if not self.parse:
+            return
+        self._flush()
+        self.index += 1
+        parent = self.stack[-1] if self.stack else None
+        reading = parent is not None and parent['parts'] is not None
+        element = {'name': name, 'index': self.index, 'key': None, 'parts': [] if reading else None}
+
+        markdown = self.markdown
+        try:
+            if name == (TEXTNS, 'a'):
+                link = attrs.get((XLINKNS, 'href'), 'unkown')
+                element['format'] = lambda text: f"[{text}]({link})" if markdown and text else text
+                element['key'] = self.index - 1
+            elif name == (DRAWNS, 'line'):
+                self._write(self.index - 1, self.index, "---" if markdown else '')
+            elif name == (TEXTNS, 'p'):
+                if parent is not None and parent['name'] == (TEXTNS, 'list-item'):
+                    element['format'] = lambda text: f"- {text}"
+                else:
+                    element['format'] = lambda text: f"{text}" if markdown and text else text
+                element['key'] = self.index
+            elif name == (TEXTNS, 'h'):
+                level = int(attrs.get((TEXTNS, 'outline-level'), '4'))
+                element['format'] = lambda text: f"{'#'*level} {text}" if markdown and text else text
+                element['key'] = self.index
+        except Exception as ex:
+            print(f"{ex} processing element {self.index}")
+
+        if element['key'] is not None:
+            element['parts'] = []
+            self._write(element['key'], self.index, None)
+        if name in WHITESPACE and reading:
+            # its own content is not part of the text
+            element['parts'] = None
+            count = attrs.get((TEXTNS, 'c')) if name == (TEXTNS, 's') else None
+            parent['parts'].append(" " * int(count) if count else WHITESPACE[name])
+        self.stack.append(element)
+
+    def endElementNS(self, name, qname):
+        if not self.parse:
+            return
+        self._flush()
+        element = self.stack.pop()
+        text = None if element['parts'] is None else ''.join(element['parts'])
+        if element['key'] is not None:
+            self._write(element['key'], element['index'], element['format'](text))
+        if text is not None and name not in WHITESPACE and self.stack and self.stack[-1]['parts'] is not None:
+            self.stack[-1]['parts'].append(text)
+        if name == (OFFICENS, 'body'):
+            self.parse = False
+
+    def _write(self, key, owner, value):
+        # the entry belongs to the last node (in document order) that wrote it
+        if value is None:
+            self.owners[key] = owner
+            self.result.setdefault(key, '')
+        elif self.owners.get(key, owner) <= owner:
+            self.owners[key] = owner
+            self.result[key] = value
+
+
+def read_indexed_text(file_path, markdown = True) -> dict[int:str]:
+    """
+    Same result as OdtDocument(file_path).get_indexed_text(markdown), streamed
+    from content.xml without loading the document.
+    """
+    parser = make_parser()
+    parser.setFeature(handler.feature_namespaces, 1)
+    parser.setFeature(handler.feature_external_ges, 0)
+    content_handler = IndexedTextHandler(markdown)
+    parser.setContentHandler(content_handler)
+    with zipfile.ZipFile(file_path) as package, package.open('content.xml') as content:
+        parser.parse(content)
+    return content_handler.result
+
+
+def read_text(file_path, markdown = True) -> str:
+    return "\n".join(read_indexed_text(file_path, markdown = markdown).values())
+
+
 if __name__ == "__main__":
 
     import json
@@ -1,28 +1,150 @@
 from typing import Annotated, List, Dict, Any, Optional
 from langchain_core.tools import tool
 from dotenv import load_dotenv
-import requests
+import asyncio
+import copy
+import httpx
 import os
-import json
+import threading
+import time
+import weakref
 
 # load environment variables from .env file
 load_dotenv()
 
+OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:31434')
+# seconds a /api/ps (running models) or /api/tags (installed models) answer is reused
+OLLAMA_PS_TTL = float(os.getenv('OLLAMA_PS_TTL', 2))
+OLLAMA_TAGS_TTL = float(os.getenv('OLLAMA_TAGS_TTL', 30))
+
+
+class OllamaClient:
+    """
+    Ollama REST client with keep-alive connection pools (one sync client and one
+    async client per event loop) and cached answers: /api/ps for a short TTL and
+    /api/show per model digest, since the details of a model only change when it
+    is pulled again. Callers receive copies of the cached answers.
+    """
+
+    def __init__(self, host = OLLAMA_HOST, ps_ttl = OLLAMA_PS_TTL, tags_ttl = OLLAMA_TAGS_TTL, timeout = 30.0):
+        self.host = host.rstrip('/')
+        self.ps_ttl = ps_ttl
+        self.tags_ttl = tags_ttl
+        self.timeout = timeout
+        self._client = httpx.Client(base_url=self.host, timeout=timeout)
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._timed = {}
+        self._details = {}
+
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Async client of the running event loop (connections can not be shared between loops).
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(base_url=self.host, timeout=self.timeout)
+        return client
+
+    def _fresh(self, path, ttl):
+        with self._lock:
+            entry = self._timed.get(path)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def _store(self, path, result):
+        with self._lock:
+            self._timed[path] = (time.monotonic(), result)
+        return result
+
+    def _get(self, path, ttl):
+        result = self._fresh(path, ttl)
+        if result is None:
+            response = self._client.get(path)
+            response.raise_for_status()  # Raises an HTTPError for bad responses
+            result = self._store(path, response.json())
+        return copy.deepcopy(result)
+
+    async def _aget(self, path, ttl):
+        result = self._fresh(path, ttl)
+        if result is None:
+            response = await self.async_client().get(path)
+            response.raise_for_status()
+            result = self._store(path, response.json())
+        return copy.deepcopy(result)
+
+    def ps(self, max_age: Optional[float] = None) -> dict:
+        return self._get('/api/ps', self.ps_ttl if max_age is None else max_age)
+
+    async def aps(self, max_age: Optional[float] = None) -> dict:
+        return await self._aget('/api/ps', self.ps_ttl if max_age is None else max_age)
+
+    def tags(self) -> dict:
+        return self._get('/api/tags', self.tags_ttl)
+
+    async def atags(self) -> dict:
+        return await self._aget('/api/tags', self.tags_ttl)
+
+    @staticmethod
+    def _digest(tags, model_name):
+        names = {model_name, model_name if ':' in model_name else f"{model_name}:latest"}
+        for model in tags.get('models', []):
+            if model.get('name') in names or model.get('model') in names:
+                return model.get('digest')
+        return None
+
+    def show(self, model_name: str) -> dict:
+        digest = self._digest(self.tags(), model_name)
+        key = (model_name, digest)
+        if digest is None or key not in self._details:
+            response = self._client.post('/api/show', json={"model": model_name})
+            response.raise_for_status()
+            if digest is None:
+                return response.json()
+            self._details[key] = response.json()
+        return copy.deepcopy(self._details[key])
+
+    async def ashow(self, model_name: str) -> dict:
+        digest = self._digest(await self.atags(), model_name)
+        key = (model_name, digest)
+        if digest is None or key not in self._details:
+            response = await self.async_client().post('/api/show', json={"model": model_name})
+            response.raise_for_status()
+            if digest is None:
+                return response.json()
+            self._details[key] = response.json()
+        return copy.deepcopy(self._details[key])
+
+    def post(self, path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+        response = self._client.post(path, json=payload, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def apost(self, path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+        response = await self.async_client().post(path, json=payload, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def invalidate(self):
+        with self._lock:
+            self._timed.clear()
+            self._details.clear()
+
+
+ollama_client = OllamaClient()
+
+
 @tool
 def ollama_model() -> Annotated[dict, "JSON response with running models information"]:
     """Gets the list of running ollama models."""
-    OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:31434')
-    response = requests.get(f"{OLLAMA_HOST}/api/ps")
-    response.raise_for_status()  # Raises an HTTPError for bad responses
-    return response.json()
+    return ollama_client.ps()
 
 @tool
 def ollama_model_details(model_name: Annotated[str, "The name of the model to get details for"]) -> Annotated[dict, "JSON response with model details"]:
     """Gets model details."""
-    OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:31434')
-    response = requests.post(f"{OLLAMA_HOST}/api/show", json={"model": model_name})
-    response.raise_for_status()  # Raises an HTTPError for bad responses
-    return response.json()
+    return ollama_client.show(model_name)
 
 if __name__ == "__main__":
 
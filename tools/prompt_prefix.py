@@ -0,0 +1,115 @@
+"""Byte-stable prompt prefixes and prefill statistics for Ollama chat models."""
+
+from typing import Any
+import json
+import threading
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import messages_to_dict
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def canonical(value: Any) -> Any:
+    """
+    Copy of a JSON value with the keys of every object sorted.
+    """
+    if isinstance(value, dict):
+        return {key: canonical(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    return value
+
+
+def stable_tools(tools) -> list[dict]:
+    """
+    Tool schemas for bind_tools in a fixed order (by name) and with sorted keys,
+    so the tool block of the prompt is byte-identical on every request whatever
+    order the MCP server or the modules list the tools in.
+    """
+    return sorted((canonical(convert_to_openai_tool(tool)) for tool in tools), key=lambda tool: tool['function']['name'])
+
+
+def request_text(messages, tools = None) -> str:
+    """
+    Serialized request (tools, then messages) used to compare consecutive prompts.
+    """
+    return (json.dumps(canonical(tools or []), default=str) + '\n'
+        + '\n'.join(json.dumps(message, sort_keys=True, default=str) for message in messages_to_dict(messages)))
+
+
+def common_prefix(first: str, second: str) -> int:
+    size = min(len(first), len(second))
+    low, high = 0, size
+    # binary search on the length of the shared prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class PrefixStats(BaseCallbackHandler):
+    """
+    Callback that reports, for every chat model call, how much of the prompt was
+    the same as in the previous call (reused_chars, compared on the serialized
+    request) and how many prompt tokens the server actually processed
+    (prefill_tokens and prefill_seconds, from Ollama's prompt_eval_count and
+    prompt_eval_duration). Ollama only evaluates the tokens after the part of the
+    prompt cached from the previous request, so a stable prefix shows up as
+    prefill_tokens far below prompt_tokens. prompt_tokens is estimated from the
+    prompt size with the tokens per character of the calls that reused the least.
+    """
+
+    def __init__(self, file = None):
+        self.file = file
+        self.calls = []
+        self._started = {}
+        self._previous = ''
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, invocation_params = None, **kwargs):
+        tools = (invocation_params or {}).get('tools')
+        text = request_text(messages[0], tools)
+        with self._lock:
+            self._started[run_id] = {'prompt_chars': len(text), 'reused_chars': common_prefix(self._previous, text)}
+            self._previous = text
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            call = self._started.pop(run_id, None)
+        if call is None:
+            return
+        info = (response.generations[0][0].generation_info or {}) if response.generations and response.generations[0] else {}
+        call['prefill_tokens'] = info.get('prompt_eval_count', 0)
+        call['prefill_seconds'] = info.get('prompt_eval_duration', 0) / 1e9
+        call['output_tokens'] = info.get('eval_count', 0)
+        with self._lock:
+            self.calls.append(call)
+            ratio = self.tokens_per_char()
+            call['prompt_tokens'] = max(round(call['prompt_chars'] * ratio), call['prefill_tokens'])
+            call['reused_tokens'] = call['prompt_tokens'] - call['prefill_tokens']
+        if self.file is not None:
+            print(self.format(call), file=self.file)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._started.pop(run_id, None)
+
+    def tokens_per_char(self) -> float:
+        cold = [call for call in self.calls if call['prefill_tokens']]
+        return max((call['prefill_tokens'] / call['prompt_chars'] for call in cold), default=0.25)
+
+    @staticmethod
+    def format(call: dict) -> str:
+        return (f"prompt: {call['prompt_tokens']} tokens, prefill: {call['prefill_tokens']} tokens "
+            f"({call['prefill_seconds']:.2f}s), reused: {call['reused_tokens']} tokens, "
+            f"same prefix: {call['reused_chars']}/{call['prompt_chars']} chars")
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {'calls': len(self.calls),
+                'prompt_tokens': sum(call['prompt_tokens'] for call in self.calls),
+                'prefill_tokens': sum(call['prefill_tokens'] for call in self.calls),
+                'reused_tokens': sum(call['reused_tokens'] for call in self.calls),
+                'prefill_seconds': sum(call['prefill_seconds'] for call in self.calls)}
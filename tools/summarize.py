@@ -0,0 +1,148 @@
+"""Map-reduce summarization of texts longer than the model context."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import os
+import re
+from langchain_core.messages import HumanMessage, SystemMessage
+
+try:
+    from tools.llm_cache import llm_cache, llm_settings
+    from tools.ollama_operations import ollama_model_details
+except ImportError:
+    from llm_cache import llm_cache, llm_settings
+    from ollama_operations import ollama_model_details
+
+# context used by the Ollama server when the request does not set num_ctx
+DEFAULT_NUM_CTX = int(os.getenv('OLLAMA_CONTEXT_LENGTH', 4096))
+# rough size of a token for budgeting prompts without the model tokenizer
+CHARS_PER_TOKEN = 4
+PROMPT = "Summarize the given text in {words} words. /no_think"
+MAP_PROMPT = "Summarize the given part of a longer text in {words} words. Keep names, figures and conclusions. /no_think"
+REDUCE_PROMPT = "Combine the given partial summaries of a text in a single summary of {words} words. /no_think"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def context_length(llm) -> int:
+    """
+    Context window used by the model: its num_ctx, else the num_ctx parameter of
+    the Ollama model, else the server default, capped at what the model supports.
+    """
+    if getattr(llm, 'num_ctx', None):
+        return llm.num_ctx
+    model, _ = llm_settings(llm)
+    try:
+        details = ollama_model_details.invoke(input={'model_name': model})
+    except Exception:
+        return DEFAULT_NUM_CTX
+    match = re.search(r'^num_ctx\s+(\d+)', details.get('parameters', ''), re.MULTILINE)
+    num_ctx = int(match.group(1)) if match else DEFAULT_NUM_CTX
+    trained = [value for key, value in details.get('model_info', {}).items() if key.endswith('.context_length')]
+    return min([num_ctx] + trained)
+
+
+def split_text(text: str, chunk_tokens: int) -> list[str]:
+    """
+    Split the text in chunks of at most chunk_tokens (estimated), cutting between
+    lines when possible and between words otherwise.
+    """
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = ''
+    for line in text.splitlines():
+        while len(line) > max_chars:
+            cut = line.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(line[:cut])
+            line = line[cut:].lstrip()
+        if current and len(current) + len(line) + 1 > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n{line}" if current else line
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def trim_text(text: str, tokens: int) -> str:
+    """
+    Cut the text to at most tokens (estimated), between words when possible.
+    """
+    max_chars = max(tokens - 1, 1) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes a text that does not fit in the model context: the text is split in
+    chunks sized to the context, the chunks are summarized in parallel (map) and the
+    partial summaries are combined by groups that fit in the context until a single
+    summary is left (reduce). Texts that fit are summarized with one request.
+    A partial summary longer than half the budget (the model ignored the word
+    limit) is trimmed, so every reduce request fits and combines at least two.
+    Every request goes through the LLM response cache.
+    """
+
+    def __init__(self, llm, words = 200, max_workers = 4, num_ctx: Optional[int] = None,
+        prompt = PROMPT, map_prompt = MAP_PROMPT, reduce_prompt = REDUCE_PROMPT, cache = llm_cache):
+        self.llm = llm
+        self.words = words
+        self.max_workers = max_workers
+        self.num_ctx = num_ctx or context_length(llm)
+        self.prompt = prompt
+        self.map_prompt = map_prompt
+        self.reduce_prompt = reduce_prompt
+        self.cache = cache
+
+    @property
+    def chunk_tokens(self) -> int:
+        """
+        Input budget of a request: the context minus the prompt and the answer.
+        """
+        prompt = estimate_tokens(max(self.prompt, self.map_prompt, self.reduce_prompt, key=len))
+        answer = self.words * 2
+        return max(int((self.num_ctx - prompt - answer) * 0.9), 64)
+
+    def _summarize(self, system_prompt, text) -> str:
+        messages = [SystemMessage(content=system_prompt.format(words=self.words)), HumanMessage(content=text)]
+        return self.cache.invoke(self.llm, messages).content.strip()
+
+    def _summarize_all(self, system_prompt, texts) -> list[str]:
+        if len(texts) == 1:
+            return [self._summarize(system_prompt, texts[0])]
+        with ThreadPoolExecutor(min(self.max_workers, len(texts))) as pool:
+            return list(pool.map(lambda text: self._summarize(system_prompt, text), texts))
+
+    def _group(self, summaries) -> list[str]:
+        groups = []
+        for summary in summaries:
+            if groups and estimate_tokens(groups[-1]) + estimate_tokens(summary) <= self.chunk_tokens:
+                groups[-1] += '\n\n' + summary
+            else:
+                groups.append(summary)
+        return groups
+
+    def summarize(self, text: str) -> str:
+        chunks = split_text(text, self.chunk_tokens)
+        if not chunks:
+            return ''
+        if len(chunks) == 1:
+            return self._summarize(self.prompt, chunks[0])
+        summaries = self._summarize_all(self.map_prompt, chunks)
+        while len(summaries) > 1:
+            summaries = [trim_text(summary, self.chunk_tokens // 2) for summary in summaries]
+            summaries = self._summarize_all(self.reduce_prompt, self._group(summaries))
+        return summaries[0]
+
+
+def summarize_text(text: str, llm, words = 200, max_workers = 4, num_ctx: Optional[int] = None) -> str:
+    return MapReduceSummarizer(llm, words=words, max_workers=max_workers, num_ctx=num_ctx).summarize(text)
@@ -0,0 +1,56 @@
+"""In-memory cache of CSV tables that re-parses a file only when it changes."""
+
+import os
+import threading
+import pandas as pd
+
+
+class TableCache:
+    """
+    Caches the DataFrame and the to_dict(orient="records") payload of CSV files.
+
+    Entries are validated against the file inode, size and modification time,
+    so an edited or replaced file is parsed again on the next access.
+    """
+
+    def __init__(self, **read_csv_kwargs):
+        self.read_csv_kwargs = read_csv_kwargs
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(file_path):
+        stat = os.stat(file_path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _entry(self, file_path) -> dict:
+        signature = self._signature(file_path)
+        entry = self._entries.get(file_path)
+        if entry is not None and entry['signature'] == signature:
+            return entry
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or entry['signature'] != signature:
+                df = pd.read_csv(file_path, **self.read_csv_kwargs)
+                entry = {'signature': signature, 'df': df, 'records': df.to_dict(orient="records")}
+                self._entries[file_path] = entry
+        return entry
+
+    def dataframe(self, file_path) -> pd.DataFrame:
+        """
+        Return the cached DataFrame of the file. Do not modify it in place.
+        """
+        return self._entry(file_path)['df']
+
+    def records(self, file_path) -> list[dict]:
+        """
+        Return the cached list of row dicts of the file. Do not modify it in place.
+        """
+        return self._entry(file_path)['records']
+
+    def invalidate(self, file_path = None):
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(file_path, None)
@@ -0,0 +1,169 @@
+"""Bounded two-tier (memory + SQLite) cache for scraped pages and search results."""
+
+from collections import OrderedDict
+from typing import Any, Optional
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+WEB_CACHE_PATH = os.getenv('WEB_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'web_cache.db'))
+WEB_CACHE_MAX_BYTES = int(os.getenv('WEB_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+WEB_CACHE_MEMORY_BYTES = int(os.getenv('WEB_CACHE_MEMORY_BYTES', 32 * 1024 * 1024))
+WEB_CACHE_TTL_HOURS = float(os.getenv('WEB_CACHE_TTL_HOURS', 24 * 30))
+# memory hits whose access time is kept in memory before updating the disk tier
+TOUCH_BATCH = 64
+
+
+class WebCache:
+    """
+    Key/value cache with a least-recently-used memory tier in front of a SQLite file.
+
+    Values are pickled and zlib-compressed in a single table that also acts as
+    the index (key, stored_at, accessed_at, size). The memory tier keeps the
+    uncompressed pickles, so hits skip the disk and the decompression but still
+    return a private copy that callers may modify. Both tiers have a byte budget;
+    when the disk tier goes over it, the least recently used entries and the ones
+    older than ttl_hours are evicted. Memory hits are written back to accessed_at
+    in batches (at the latest before an eviction), so the disk LRU order also
+    counts the pages served from memory.
+    """
+
+    def __init__(self, db_path = WEB_CACHE_PATH, namespace = 'page', max_bytes = WEB_CACHE_MAX_BYTES,
+        memory_bytes = WEB_CACHE_MEMORY_BYTES, ttl_hours = WEB_CACHE_TTL_HOURS):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.ttl_hours = ttl_hours
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+        self.connection = self.connect(db_path)
+        self._disk_size = self.connection.execute(
+            "SELECT coalesce(sum(size), 0) FROM entries WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def connect(self, db_path):
+        connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT, key TEXT, stored_at REAL, accessed_at REAL, size INTEGER, body BLOB,
+                PRIMARY KEY (namespace, key));
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed_at);
+        """)
+        return connection
+
+    def get(self, key: str, max_age_hours: Optional[float] = None) -> Any:
+        """
+        Return the cached value or None if it is missing or older than max_age_hours.
+        """
+        max_age = (self.ttl_hours if max_age_hours is None else max_age_hours) * 3600
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < max_age:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    if len(self._touched) >= TOUCH_BATCH:
+                        self._flush_touched()
+                    return pickle.loads(entry[1])
+                return None
+
+            row = self.connection.execute("SELECT stored_at, body FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)).fetchone()
+            if row is None or now - row[0] >= max_age:
+                return None
+            self.connection.execute("UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key))
+            data = zlib.decompress(row[1])
+            self._remember(key, row[0], data)
+            return pickle.loads(data)
+
+    def set(self, key: str, value: Any):
+        data = pickle.dumps(value)
+        body = zlib.compress(data, 6)
+        now = time.time()
+        with self._lock:
+            old = self.connection.execute("SELECT size FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)).fetchone()
+            self.connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, now, now, len(body), body))
+            self._disk_size += len(body) - (old[0] if old else 0)
+            self._remember(key, now, data)
+            if self._disk_size > self.max_bytes:
+                self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self.connection.execute("SELECT size FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)).fetchone()
+            self.connection.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            if row:
+                self._disk_size -= row[0]
+            if key in self._memory:
+                self._memory_size -= self._memory.pop(key)[2]
+            self._touched.pop(key, None)
+
+    def _flush_touched(self):
+        touched, self._touched = self._touched, {}
+        self.connection.executemany("UPDATE entries SET accessed_at = max(accessed_at, ?) WHERE namespace = ? AND key = ?",
+            [(accessed_at, self.namespace, key) for key, accessed_at in touched.items()])
+
+    def _remember(self, key, stored_at, data):
+        size = len(data)
+        if key in self._memory:
+            self._memory_size -= self._memory.pop(key)[2]
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = (stored_at, data, size)
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            self._memory_size -= self._memory.popitem(last=False)[1][2]
+
+    def _evict(self, now):
+        """
+        Drop expired entries, then the least recently used ones until the disk
+        tier is at 90% of its budget.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._flush_touched()
+            self.connection.execute("DELETE FROM entries WHERE namespace = ? AND stored_at < ?",
+                (self.namespace, now - self.ttl_hours * 3600))
+            self._disk_size = self.connection.execute(
+                "SELECT coalesce(sum(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            target = self.max_bytes * 0.9
+            evicted = []
+            for key, size in self.connection.execute(
+                "SELECT key, size FROM entries WHERE namespace = ? ORDER BY accessed_at", (self.namespace,)).fetchall():
+                if self._disk_size <= target:
+                    break
+                evicted.append((self.namespace, key))
+                self._disk_size -= size
+            self.connection.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", evicted)
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        for _, key in evicted:
+            if key in self._memory:
+                self._memory_size -= self._memory.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+            self._memory.clear()
+            self._memory_size = 0
+            self._touched.clear()
+            self._disk_size = 0
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT count(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()[0]
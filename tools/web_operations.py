@@ -8,61 +8,241 @@ from ddgs import DDGS
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_core.documents import Document
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import aiohttp
+import asyncio
 import json
 import re
-import hashlib
-import pickle
-import time
+import threading
 
+try:
+    from tools.web_cache import WebCache
+    from tools.single_flight import SingleFlight
+    from tools.dedup import DocumentDeduplicator
+    from tools.async_utils import run_coroutine_sync
+except ImportError:
+    from web_cache import WebCache
+    from single_flight import SingleFlight
+    from dedup import DocumentDeduplicator
+    from async_utils import run_coroutine_sync
 
-def load_from_cache(url, cache_time):
-    cache_key = hashlib.md5(url.encode()).hexdigest()
-    cache_file = f"/tmp/{cache_key}.tmp"
-    
+page_cache = WebCache(namespace='page')
+# concurrent scrapes of the same page (and options) wait for a single download
+scrape_flights = SingleFlight()
+search_cache = WebCache(namespace='search')
+search_flights = SingleFlight()
+# documents already returned in this session, so later rounds of research drop their copies
+seen_documents = DocumentDeduplicator()
+_seen_lock = threading.Lock()
+# maximum number of characters of text kept from a page
+MAX_PAGE_CHARS = 100000
+LINK_PATTERN = re.compile(r'https?://(?:[-\w.])+(?:[:\d]+)?(?:/(?:[\w/_.])*(?:\?(?:[\w.])*)?(?:#(?:[\w.])*)?)?')
+
+
+def page_key(url, extract_links, min_words_per_line, max_chars) -> str:
+    """
+    Cache and flight key of a scraped page: the document depends on the extraction options.
+    """
+    return json.dumps([url, extract_links, min_words_per_line, max_chars])
+
+def read_cache(cache, key, max_age_hours):
+    """
+    Cached value or None. An unreadable entry (corrupt, incompatible pickle,
+    locked database) is deleted and read as a miss, so the caller fetches again.
+    """
     try:
-        if time.time() - os.path.getmtime(cache_file) < cache_time * 3600:
-            with open(cache_file, 'rb') as f:
-                print(f"Webpage loaded from cache {cache_file}")
-                return pickle.load(f)
-    except:
-        pass
-    return None
+        return cache.get(key, max_age_hours=max_age_hours)
+    except Exception as e:
+        print(f"Error reading cache {key}: {e}")
+        try:
+            cache.delete(key)
+        except Exception:
+            pass
+        return None
 
-def store_in_cache(url, docs):
-    cache_key = hashlib.md5(url.encode()).hexdigest()
-    cache_file = f"/tmp/{cache_key}.tmp"
-    
+def load_from_cache(url, key, cache_time):
+    docs = read_cache(page_cache, key, cache_time)
+    if docs is not None:
+        print(f"Webpage loaded from cache {url}")
+    return docs
+
+def store_in_cache(url, key, docs):
     try:
-        with open(cache_file, 'wb') as f:
-            pickle.dump(docs, f)
-    except:
-        print(f"Error writing cache {cache_file}")
+        page_cache.set(key, docs)
+    except Exception as e:
+        print(f"Error writing cache {url}: {e}")
     return None
 
+def extract_text(soup, extract_links = False, min_words_per_line = 5, max_chars = MAX_PAGE_CHARS):
+    """
+    Single pass over the text nodes of the parse tree that rebuilds the lines of
+    soup.get_text(), keeps those with at least min_words_per_line words and
+    collects the links found in any line. Stops once max_chars are kept.
+    Returns (text, links).
+    """
+    lines, links = [], {}
+    size = 0
+    pending = ''
+
+    def add(line):
+        nonlocal size
+        if extract_links:
+            links.update(dict.fromkeys(LINK_PATTERN.findall(line)))
+        line = line.strip()
+        if len(line.split()) >= min_words_per_line:
+            lines.append(line)
+            size += len(line) + 1
+        return max_chars is not None and size >= max_chars
+
+    for string in soup.strings:
+        *complete, pending_tail = (pending + string).split('\n') if '\n' in string else [pending + string]
+        pending = pending_tail
+        for line in complete:
+            if add(line):
+                return '\n'.join(lines)[:max_chars], list(links)
+    add(pending)
+    text = '\n'.join(lines)
+    return (text if max_chars is None else text[:max_chars]), list(links)
+
+def soup_to_document(url, soup, extract_links = False, min_words_per_line = 5, max_chars = MAX_PAGE_CHARS) -> Document:
+    """
+    Build a Document from a parsed page, with the same metadata as WebBaseLoader.
+    """
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html_tag := soup.find("html"):
+        metadata["language"] = html_tag.get("lang", "No language found.")
+    text, links = extract_text(soup, extract_links, min_words_per_line, max_chars)
+    if extract_links:
+        metadata['links'] = links
+    return Document(page_content=text, metadata=metadata)
+
+def html_to_document(url, html, extract_links = False, min_words_per_line = 5, max_chars = MAX_PAGE_CHARS) -> Document:
+    """
+    Parse an html page into a Document.
+    """
+    return soup_to_document(url, BeautifulSoup(html, "html.parser"), extract_links, min_words_per_line, max_chars)
+
+_extraction_pool = None
+
+def extraction_pool() -> ProcessPoolExecutor:
+    """Worker processes that parse the downloaded pages, shared by all the batches."""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+    return _extraction_pool
+
+async def iter_scrape_webpages(urls, extract_links = False, min_words_per_line = 5, cache_time = 240,
+    max_chars = MAX_PAGE_CHARS, max_connections = 16, max_per_host = 4, timeout = 30):
+    """
+    Scrape many urls concurrently and yield (url, docs) as each page finishes;
+    docs is the exception raised when the page could not be scraped.
+    Downloads share one aiohttp session limited per host and the html parsing
+    runs in the extraction process pool.
+    """
+    loop = asyncio.get_running_loop()
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_per_host)
+    headers = {'User-Agent': os.getenv('USER_AGENT', 'Mozilla/5.0')}
+
+    async with aiohttp.ClientSession(connector=connector, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+
+        async def fetch(url, key):
+            # another flight may have just cached it
+            docs = load_from_cache(url, key, cache_time)
+            if docs is None:
+                async with session.get(url, raise_for_status=True) as response:
+                    html = await response.text(errors='replace')
+                docs = [await loop.run_in_executor(extraction_pool(), html_to_document, url, html, extract_links, min_words_per_line, max_chars)]
+                store_in_cache(url, key, docs)
+            return docs
+
+        async def scrape(url):
+            key = page_key(url, extract_links, min_words_per_line, max_chars)
+            try:
+                docs = load_from_cache(url, key, cache_time)
+                if docs is None:
+                    docs = await scrape_flights.ado(key, fetch, url, key)
+                return url, docs
+            except Exception as e:
+                return url, e
+
+        for next_done in asyncio.as_completed([scrape(url) for url in dict.fromkeys(urls)]):
+            yield await next_done
+
+def seen_document(document) -> Optional[Document]:
+    """
+    Register the document in the session deduplicator. Returns the document seen
+    earlier in the session that it copies or nearly copies, or None when it is new.
+    """
+    if not document.page_content.strip():
+        return None
+    with _seen_lock:
+        return seen_documents.add(document)
+
+def drop_seen_documents(documents, stubs = False) -> List[Document]:
+    """
+    Drop the documents that copy one seen earlier in the session or earlier in the
+    list; with stubs they are replaced by empty documents naming the original.
+    """
+    with _seen_lock:
+        return seen_documents.deduplicate(documents, stubs=stubs)
+
 @tool
 def scrape_webpages(url: Annotated[str, "The URL of the webpage to scrape"],
     extract_links: Annotated[bool, "Whether to extract links from the content"]=False,
     min_words_per_line: Annotated[int, "Minimum number of words per line to include in the document"] = 5,
-    cache_time: Annotated[int, "cached document expire time in hours, use 0 for disabling the cache"] = 240
+    cache_time: Annotated[int, "cached document expire time in hours, use 0 for disabling the cache"] = 240,
+    max_chars: Annotated[Optional[int], "Maximum number of characters of text to keep per page"] = MAX_PAGE_CHARS
     ) -> Annotated[List[Document], "The page document"]:
     """Scrape and read the provided web page url for detailed information"""
 
-    docs = load_from_cache(url, cache_time)
+    key = page_key(url, extract_links, min_words_per_line, max_chars)
+    docs = load_from_cache(url, key, cache_time)
     if docs is not None: return docs
-    
-    # Scrape the webpage
-    loader = WebBaseLoader(url, raise_for_status=True)
-    docs = loader.load()
-    
-    for doc in docs:
-        if extract_links:
-            doc.metadata['links'] = list(set(re.findall(r'https?://(?:[-\w.])+(?:[:\d]+)?(?:/(?:[\w/_.])*(?:\?(?:[\w.])*)?(?:#(?:[\w.])*)?)?', doc.page_content)))
-        text = [line.strip() for line in doc.page_content.split('\n') if len(line.strip().split()) >= min_words_per_line]
-        doc.page_content = '\n'.join(text)
-        
-    store_in_cache(url, docs)
-        
-    return docs
+
+    def fetch():
+        # another flight may have just cached it
+        docs = load_from_cache(url, key, cache_time)
+        if docs is not None: return docs
+
+        # Scrape the webpage
+        loader = WebBaseLoader(url, raise_for_status=True)
+        docs = [soup_to_document(url, loader.scrape(), extract_links, min_words_per_line, max_chars)]
+
+        store_in_cache(url, key, docs)
+        return docs
+
+    return scrape_flights.do(key, fetch)
+
+
+@tool
+def scrape_webpages_batch(urls: Annotated[List[str], "The URLs of the webpages to scrape"],
+    extract_links: Annotated[bool, "Whether to extract links from the content"]=False,
+    min_words_per_line: Annotated[int, "Minimum number of words per line to include in the document"] = 5,
+    cache_time: Annotated[int, "cached document expire time in hours, use 0 for disabling the cache"] = 240,
+    max_chars: Annotated[Optional[int], "Maximum number of characters of text to keep per page"] = MAX_PAGE_CHARS,
+    deduplicate: Annotated[bool, "Return pages whose content is a copy or near copy of a page already scraped in this session without their content"] = False
+    ) -> Annotated[List[Document], "One document per page, in the order of the urls"]:
+    """Scrape and read many web pages at once. Pages that fail have an 'error' in their metadata.
+    With deduplicate, a page that copies one already returned in this session or earlier in the list comes
+    back empty with metadata['duplicate_of'] set to the url of the original"""
+
+    async def scrape_all():
+        return {url: docs async for url, docs in iter_scrape_webpages(urls, extract_links, min_words_per_line, cache_time, max_chars)}
+
+    results = run_coroutine_sync(scrape_all())
+    documents = []
+    for url in dict.fromkeys(urls):
+        if isinstance(results[url], Exception):
+            documents.append(Document(page_content='', metadata={'source': url, 'error': str(results[url])}))
+        else:
+            documents.extend(results[url])
+    if deduplicate:
+        documents = drop_seen_documents(documents, stubs=True)
+    return documents
 
 
 # def get_root_host(url):
@@ -87,13 +267,65 @@ def scrape_webpages(url: Annotated[str, "The URL of the webpage to scrape"],
 #     return markdownify(response.text)
 
 
+def ddgs_search(query, num_results) -> List[Dict[str, str]]:
+    return DDGS().text(query, max_results=num_results, backend='lite')
+
+# function (query, num_results) -> [{'title', 'href', 'body'}] used by web_search;
+# replace it to use another engine or a local stand-in
+search_backend = ddgs_search
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+def cached_search(query, num_results = 5, cache_time = 24) -> List[Dict[str, str]]:
+    """
+    Run a search through search_backend, reusing the results of the same
+    normalized query made less than cache_time hours ago.
+    """
+    key = f"{num_results}:{normalize_query(query)}"
+    results = read_cache(search_cache, key, cache_time)
+    if results is not None:
+        return results
+
+    def search():
+        results = read_cache(search_cache, key, cache_time)
+        if results is None:
+            results = search_backend(query, num_results)
+            try:
+                search_cache.set(key, results)
+            except Exception as e:
+                print(f"Error writing cache {key}: {e}")
+        return results
+
+    return search_flights.do(key, search)
+
 @tool
 def web_search(query: Annotated[str, "search query to look up"], 
-    num_results: Annotated[Optional[int], "Number of results per query to return (default: 5)"] = 5
+    num_results: Annotated[Optional[int], "Number of results per query to return (default: 5)"] = 5,
+    cache_time: Annotated[int, "cached results expire time in hours, use 0 for disabling the cache"] = 24
     ) ->  Annotated[List[Dict[str, str]], "The search results"]:
     """Internet search engine. Useful for when you need to answer questions about current events"""
 
-    return DDGS().text(query, max_results=num_results, backend='lite')
+    return cached_search(query, num_results, cache_time)
+
+@tool
+def web_search_batch(queries: Annotated[List[str], "search queries to look up"], 
+    num_results: Annotated[Optional[int], "Number of results per query to return (default: 5)"] = 5,
+    cache_time: Annotated[int, "cached results expire time in hours, use 0 for disabling the cache"] = 24
+    ) ->  Annotated[List[Dict[str, str]], "The search results of all the queries, without repeated urls"]:
+    """Internet search engine for many queries at once. Each url is returned only once, with the query that found it"""
+
+    queries = list(dict.fromkeys(queries))
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(queries)))) as executor:
+        all_results = list(executor.map(lambda query: cached_search(query, num_results, cache_time), queries))
+
+    results = {}
+    for query, query_results in zip(queries, all_results):
+        for result in query_results:
+            url = result.get('href') or result.get('url')
+            if url not in results:
+                results[url] = {**result, 'query': query}
+    return list(results.values())
 
 
 if __name__ == "__main__":
@@ -108,5 +340,5 @@ if __name__ == "__main__":
     
     from mcp.server.fastmcp import FastMCP
     from langchain_mcp_adapters.tools import to_fastmcp
-    FastMCP("Web Operations MCP", tools=[to_fastmcp(scrape_webpages), to_fastmcp(web_search)]).run(transport="stdio")
+    FastMCP("Web Operations MCP", tools=[to_fastmcp(scrape_webpages), to_fastmcp(scrape_webpages_batch), to_fastmcp(web_search), to_fastmcp(web_search_batch)]).run(transport="stdio")
 